@@ -0,0 +1,219 @@
+"""
+Benchmarks for the student database app.
+
+    python benchmark.py export --sizes 10000 100000 1000000
+    DB_BACKEND=sqlite SQLITE_PATH=bench.db python benchmark.py insert --rows 5000
+    DB_BACKEND=sqlite SQLITE_PATH=bench.db python benchmark.py startup --reruns 10
+    DB_BACKEND=sqlite SQLITE_PATH=bench.db python benchmark.py schema --repeat 200
+
+The export benchmark runs on synthetic rows and needs no database. The
+insert benchmark uses the database configured for database.py; it adds rows
+and deletes them again. The startup benchmark runs main.py headless with
+Streamlit's AppTest against the configured database.
+"""
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+from exports import STUDENT_COLUMNS, export_csv, export_xlsx
+
+CHUNK_SIZE = 5000
+
+
+def synthetic_students(count, seed=42):
+    rng = random.Random(seed)
+    grades = ("A", "B", "C", "D", "F")
+    return [(i + 1, f"Student {i}", rng.randint(5, 25), rng.choice(grades)) for i in range(count)]
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def csv_from_dataframe(rows):
+    """The previous path: whole table as a DataFrame, then to_csv."""
+    df = pd.DataFrame(rows, columns=STUDENT_COLUMNS)
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def xlsx_from_dataframe(rows):
+    """The previous path: whole table as a DataFrame, then an in-memory ExcelWriter."""
+    df = pd.DataFrame(rows, columns=STUDENT_COLUMNS)
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="Students")
+    return buffer.getvalue()
+
+
+def measure(function, make_args):
+    """
+    Returns (seconds, peak traced bytes). Timing and memory are measured in
+    separate runs because tracemalloc slows allocation-heavy code down.
+    """
+    started = time.perf_counter()
+    function(*make_args())
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    function(*make_args())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_export(args):
+    paths = (
+        ("csv", "dataframe", csv_from_dataframe, False),
+        ("csv", "streamed", export_csv, True),
+        ("xlsx", "dataframe", xlsx_from_dataframe, False),
+        ("xlsx", "streamed", export_xlsx, True),
+    )
+    print(f"{'students':>10}  {'format':<6} {'path':<10} {'seconds':>9} {'peak MiB':>9}")
+    for size in args.sizes:
+        rows = synthetic_students(size)
+        for export_format, label, function, streamed in paths:
+            if export_format not in args.formats:
+                continue
+            make_args = (lambda: (chunked(rows),)) if streamed else (lambda: (rows,))
+            elapsed, peak = measure(function, make_args)
+            print(f"{size:>10}  {export_format:<6} {label:<10} {elapsed:>9.3f} {peak / 2**20:>9.1f}")
+
+
+def bench_insert(args):
+    import database
+
+    database.setup_database()
+    students = [(f"Benchmark {name}", age, grade) for _, name, age, grade in synthetic_students(args.rows)]
+
+    started = time.perf_counter()
+    for name, age, grade in students:
+        database.insert_student(name, age, grade)
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    database.insert_students(students)
+    bulk = time.perf_counter() - started
+
+    for label, seconds in (("insert_student", single), ("insert_students", bulk)):
+        print(f"{label:<16} {args.rows:>8} rows  {seconds:>8.3f}s  {args.rows / seconds:>10.1f} rows/s")
+
+    ids = [row[0] for rows in database.iter_students() for row in rows
+           if row[1].startswith("Benchmark Student ")]
+    database.delete_students(ids)
+
+
+# Runs in a fresh interpreter so the first run pays for every import, like a new server process
+STARTUP_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+app, page, reruns = sys.argv[1], json.loads(sys.argv[2]), int(sys.argv[3])
+at = AppTest.from_file(app, default_timeout=120)
+for key, value in page.get("session_state", {}).items():
+    at.session_state[key] = value
+
+def timed_run():
+    started = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    return time.perf_counter() - started
+
+cold = timed_run()
+first_visit = cold
+if "widget" in page:
+    kind, index, value = page["widget"]
+    root = at.sidebar if page.get("sidebar") else at
+    getattr(root, kind)[index].set_value(value)
+    first_visit = timed_run()
+warm = [timed_run() for _ in range(reruns)]
+print(json.dumps({"cold": cold, "first_visit": first_visit, "warm": warm}))
+"""
+
+STARTUP_PAGES = {
+    "Add Student": {},
+    "Import Students": {"sidebar": True, "widget": ["selectbox", 0, "Import Students"]},
+    "View Students": {"sidebar": True, "widget": ["selectbox", 0, "View Students"]},
+    "Update Student": {"sidebar": True, "widget": ["selectbox", 0, "Update Student"]},
+    "Delete Student": {"sidebar": True, "widget": ["selectbox", 0, "Delete Student"]},
+}
+
+
+def bench_startup(args):
+    print(f"{'page':<16} {'cold start ms':>14} {'first visit ms':>15} {'warm rerun ms':>14}")
+    for name, page in STARTUP_PAGES.items():
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE, "main.py", json.dumps(page), str(args.reruns)],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise SystemExit(f"{name}: {result.stderr.strip() or result.stdout.strip()}")
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"{name:<16} {timings['cold'] * 1000:>14.0f} {timings['first_visit'] * 1000:>15.0f} "
+            f"{statistics.median(timings['warm']) * 1000:>14.1f}"
+        )
+
+
+def bench_schema(args):
+    import database
+    import migrations
+
+    database.setup_database()
+
+    def full_ddl():
+        # What every rerun used to do before the schema was versioned
+        if database.DB_BACKEND == "mysql":
+            conn = database.create_connection(use_database=False)
+            conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS {database.DB_NAME}")
+            conn.close()
+        with database.connection() as conn:
+            cursor = conn.cursor()
+            for migration in migrations.MIGRATIONS:
+                migration.apply(cursor, database.DB_BACKEND, database.DB_NAME)
+            cursor.close()
+
+    for label, function in (("full DDL", full_ddl), ("version check", database.setup_database)):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            function()
+        print(f"{label:<14} {(time.perf_counter() - started) / args.repeat * 1000:>8.2f} ms per call")
+    print("Reruns now call neither: main.py runs setup_database once per process (st.cache_resource).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="DataFrame vs streamed CSV/XLSX export (no database)")
+    export.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    export.add_argument("--formats", nargs="+", choices=["csv", "xlsx"], default=["csv", "xlsx"])
+    export.set_defaults(run=bench_export)
+
+    insert = commands.add_parser("insert", help="per-row vs executemany inserts")
+    insert.add_argument("--rows", type=int, default=5000)
+    insert.set_defaults(run=bench_insert)
+
+    startup = commands.add_parser("startup", help="cold start and warm rerun time of each page of main.py")
+    startup.add_argument("--reruns", type=int, default=10)
+    startup.set_defaults(run=bench_startup)
+
+    schema = commands.add_parser("schema", help="per-rerun DDL vs a schema version check")
+    schema.add_argument("--repeat", type=int, default=200)
+    schema.set_defaults(run=bench_schema)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from migrations import migrate
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Fetch database credentials from environment variables
+DB_HOST = os.getenv("DB_HOST")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_NAME = os.getenv("DB_NAME")
+
+# "mysql" for the real app, "sqlite" for local testing and benchmarks
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "students.db")
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds
+
+# Rows fetched per round trip when streaming the students table
+FETCH_CHUNK_SIZE = 5000
+
+# Students listed per page in the student picker
+SEARCH_PAGE_SIZE = 50
+
+if DB_BACKEND not in ("mysql", "sqlite"):
+    raise ValueError(f"Unsupported DB_BACKEND '{DB_BACKEND}', expected 'mysql' or 'sqlite'.")
+
+
+def create_connection(use_database=True):
+    """
+    Creates a connection for the configured backend.
+    If use_database is False, MySQL connects without selecting a database
+    (used for creating the database).
+    """
+    if DB_BACKEND == "sqlite":
+        return sqlite3.connect(SQLITE_PATH, check_same_thread=False)
+    return mysql.connector.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME if use_database else None
+    )
+
+
+def _sql(query):
+    """Adapts %s placeholders to the backend's parameter style."""
+    return query.replace("%s", "?") if DB_BACKEND == "sqlite" else query
+
+
+def _is_alive(conn):
+    if DB_BACKEND == "mysql":
+        return conn.is_connected()
+    try:
+        conn.execute("SELECT 1")
+        return True
+    except sqlite3.Error:
+        return False
+
+
+# Connection pool: idle connections are reused, at most DB_POOL_SIZE are open at once
+_idle_connections = queue.LifoQueue()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_SIZE)
+
+
+def _acquire_connection():
+    if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise TimeoutError(f"No database connection available after {DB_POOL_TIMEOUT}s.")
+    try:
+        while True:
+            try:
+                conn = _idle_connections.get_nowait()
+            except queue.Empty:
+                return create_connection(use_database=True)
+            if _is_alive(conn):
+                return conn
+            conn.close()
+    except Exception:
+        _pool_slots.release()
+        raise
+
+
+def _release_connection(conn, discard=False):
+    if discard:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    else:
+        _idle_connections.put(conn)
+    _pool_slots.release()
+
+
+@contextmanager
+def connection():
+    """
+    Checks a pooled connection out for one transaction.
+    Commits on success, rolls back and drops the connection on error.
+    """
+    conn = _acquire_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        finally:
+            _release_connection(conn, discard=True)
+        raise
+    else:
+        _release_connection(conn)
+
+
+def setup_database():
+    """
+    Creates the database if it is missing and applies pending schema
+    migrations (see migrations.py). When the schema is current this runs no
+    DDL. Returns True on success, False if the database could not be reached.
+    """
+    try:
+        if DB_BACKEND == "mysql":
+            conn = create_connection(use_database=False)
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM information_schema.schemata WHERE schema_name = %s", (DB_NAME,))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(f"CREATE DATABASE {DB_NAME}")
+                print(f"Database '{DB_NAME}' created.")
+            conn.close()
+
+        with connection() as conn:
+            migrate(conn, DB_BACKEND, DB_NAME)
+        return True
+    except (mysql.connector.Error, sqlite3.Error, TimeoutError) as err:
+        print(f"Error: {err}")
+        return False
+
+
+def insert_student(name, age, grade):
+    with connection() as conn:
+        cursor = conn.cursor()
+        query = "INSERT INTO students (name, age, grade) VALUES (%s, %s, %s)"
+        cursor.execute(_sql(query), (name, int(age), grade))
+        cursor.close()
+
+
+def insert_students(students):
+    """
+    Inserts many (name, age, grade) rows with executemany in a single transaction.
+    Returns the number of rows inserted.
+    """
+    rows = [(name, int(age), grade) for name, age, grade in students]
+    if not rows:
+        return 0
+    with connection() as conn:
+        cursor = conn.cursor()
+        query = "INSERT INTO students (name, age, grade) VALUES (%s, %s, %s)"
+        cursor.executemany(_sql(query), rows)
+        cursor.close()
+    return len(rows)
+
+
+def get_all_students():
+    """
+    Returns the students table as a DataFrame built directly from the cursor.
+    """
+    import pandas as pd
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, age, grade FROM students")
+        columns = [column[0] for column in cursor.description]
+        df = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+        cursor.close()
+    return df
+
+
+def get_student(student_id):
+    """
+    Fetches one student by primary key as a dict, or None if it does not exist.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_sql("SELECT id, name, age, grade FROM students WHERE id = %s"), (int(student_id),))
+        row = cursor.fetchone()
+        cursor.close()
+    if row is None:
+        return None
+    return dict(zip(("id", "name", "age", "grade"), row))
+
+
+def search_students(name_prefix="", page_size=SEARCH_PAGE_SIZE, after=None):
+    """
+    Returns one page of (id, name, age, grade) rows whose name starts with
+    name_prefix, ordered by name then id so idx_students_name serves the query.
+    after is the (name, id) of the last row on the previous page, or None.
+    Returns (rows, next_after); next_after is None on the last page.
+    """
+    escaped = name_prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    query = "SELECT id, name, age, grade FROM students WHERE name LIKE %s ESCAPE '!'"
+    params = [escaped + "%"]
+    if after is not None:
+        query += " AND (name > %s OR (name = %s AND id > %s))"
+        params += [after[0], after[0], after[1]]
+    # Fetch one extra row to learn whether another page exists
+    query += " ORDER BY name, id LIMIT %s"
+    params.append(page_size + 1)
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_sql(query), params)
+        rows = cursor.fetchall()
+        cursor.close()
+
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, (rows[-1][1], rows[-1][0])
+    return rows, None
+
+
+def iter_students(chunk_size=FETCH_CHUNK_SIZE):
+    """
+    Yields the students table as lists of (id, name, age, grade) tuples,
+    chunk_size rows at a time. MySQL streams rows from the server through an
+    unbuffered cursor, so the whole table is never held in memory.
+    """
+    conn = _acquire_connection()
+    finished = False
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, age, grade FROM students ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+        conn.commit()
+        finished = True
+    finally:
+        # An abandoned unbuffered cursor leaves unread rows on the connection
+        _release_connection(conn, discard=not finished)
+
+
+def update_student(student_id, name, age, grade):
+    with connection() as conn:
+        cursor = conn.cursor()
+        query = """
+        UPDATE students
+        SET name = %s, age = %s, grade = %s
+        WHERE id = %s
+        """
+        cursor.execute(_sql(query), (name, int(age), grade, int(student_id)))
+        cursor.close()
+
+
+def delete_student(student_id):
+    with connection() as conn:
+        cursor = conn.cursor()
+        query = "DELETE FROM students WHERE id = %s"
+        cursor.execute(_sql(query), (int(student_id),))
+        cursor.close()
+
+
+def delete_students(student_ids):
+    """
+    Deletes many students by id with executemany in a single transaction.
+    Returns the number of ids submitted.
+    """
+    ids = [(int(student_id),) for student_id in student_ids]
+    if not ids:
+        return 0
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(_sql("DELETE FROM students WHERE id = %s"), ids)
+        cursor.close()
+    return len(ids)
@@ -0,0 +1,52 @@
+import csv
+import io
+
+STUDENT_COLUMNS = ("id", "name", "age", "grade")
+
+
+def iter_csv_bytes(chunks, columns=STUDENT_COLUMNS):
+    """
+    Yields UTF-8 encoded CSV, one piece per chunk of rows, starting with the header.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_csv(chunks, columns=STUDENT_COLUMNS):
+    """
+    Returns the rows as CSV bytes, encoded one chunk of rows at a time.
+    st.download_button serves its data from memory, so peak memory is about
+    the size of the finished file plus one chunk of rows.
+    """
+    output = io.BytesIO()
+    for piece in iter_csv_bytes(chunks, columns):
+        output.write(piece)
+    return output.getvalue()
+
+
+def export_xlsx(chunks, columns=STUDENT_COLUMNS, sheet_name="Students"):
+    """
+    Writes the rows with openpyxl's write-only workbook, which streams rows to
+    a temporary file instead of keeping every cell in memory. Returns the
+    workbook bytes, so the compressed file itself is held in memory once.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(list(columns))
+    for rows in chunks:
+        for row in rows:
+            sheet.append(list(row))
+
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
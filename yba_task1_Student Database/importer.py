@@ -0,0 +1,140 @@
+import time
+
+import pandas as pd
+
+from database import insert_students
+
+IMPORT_COLUMNS = ("name", "age", "grade")
+IMPORT_CHUNK_SIZE = 2000
+
+# Same limits as the Add Student form and the students table
+MIN_AGE, MAX_AGE = 1, 100
+MAX_NAME_LENGTH = 100
+MAX_GRADE_LENGTH = 10
+
+
+def count_rows(uploaded_file, file_name):
+    """
+    Counts data rows without parsing them, for the progress bar. Returns None
+    for XLSX files that don't record their size (no <dimension> tag, common
+    for files not written by Excel).
+    """
+    if file_name.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(uploaded_file, read_only=True)
+        max_row = workbook.active.max_row
+        workbook.close()
+        uploaded_file.seek(0)
+        if max_row is None:
+            return None
+        total = max_row - 1
+    else:
+        total = 0
+        last = b"\n"
+        for block in iter(lambda: uploaded_file.read(1 << 20), b""):
+            total += block.count(b"\n")
+            last = block[-1:]
+        # The header line is not a row, a missing final newline still ends one
+        total = total - 1 + (last != b"\n")
+    uploaded_file.seek(0)
+    return max(total, 0)
+
+
+def _xlsx_chunks(uploaded_file, chunk_size):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(uploaded_file, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(value).strip() if value is not None else "" for value in next(rows, ())]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame.from_records(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame.from_records(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def read_chunks(uploaded_file, file_name, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Yields the uploaded CSV or XLSX file as DataFrames of at most chunk_size rows.
+    An empty file yields nothing.
+    """
+    if file_name.lower().endswith(".xlsx"):
+        yield from _xlsx_chunks(uploaded_file, chunk_size)
+        return
+    try:
+        reader = pd.read_csv(uploaded_file, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    except pd.errors.EmptyDataError:
+        # Not even a header line
+        return
+    yield from reader
+
+
+def validate_chunk(df):
+    """
+    Splits a chunk into (valid, rejected) with vectorized checks.
+    valid has name/age/grade columns ready to insert; rejected keeps the
+    original values plus a reason column. Rows where every cell is blank,
+    which spreadsheet tools often leave after the data, are dropped.
+    """
+    df = df.rename(columns=lambda column: str(column).strip().lower())
+    blank = df.fillna("").astype(str).apply(lambda column: column.str.strip() == "").all(axis=1)
+    df = df[~blank]
+    missing = [column for column in IMPORT_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    name = df["name"].fillna("").astype(str).str.strip()
+    grade = df["grade"].fillna("").astype(str).str.strip()
+    age = pd.to_numeric(df["age"], errors="coerce")
+
+    reason = pd.Series("", index=df.index)
+    checks = (
+        (name == "", "Name is required."),
+        (name.str.len() > MAX_NAME_LENGTH, f"Name is longer than {MAX_NAME_LENGTH} characters."),
+        (age.isna(), "Age is not a number."),
+        (age.notna() & (age % 1 != 0), "Age must be a whole number."),
+        ((age < MIN_AGE) | (age > MAX_AGE), f"Age must be between {MIN_AGE} and {MAX_AGE}."),
+        (grade == "", "Grade is required."),
+        (grade.str.len() > MAX_GRADE_LENGTH, f"Grade is longer than {MAX_GRADE_LENGTH} characters."),
+    )
+    # Keep the first failing check as the reason
+    for failed, message in checks:
+        reason = reason.mask(failed & (reason == ""), message)
+
+    ok = reason == ""
+    valid = pd.DataFrame({"name": name[ok], "age": age[ok].astype(int), "grade": grade[ok]})
+    rejected = df.loc[~ok, list(IMPORT_COLUMNS)].assign(reason=reason[~ok])
+    return valid, rejected
+
+
+def import_students(uploaded_file, file_name, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Imports the file chunk by chunk, inserting each chunk's valid rows in one
+    transaction. Yields running totals after every chunk:
+    rows_read, inserted, rejected (that chunk's rejected rows with their file
+    row number and reason), seconds and rows_per_second.
+    """
+    started = time.perf_counter()
+    rows_read = 0
+    inserted = 0
+    for chunk in read_chunks(uploaded_file, file_name, chunk_size):
+        valid, rejected = validate_chunk(chunk.reset_index(drop=True))
+        # Spreadsheet row number of each rejected row, counting the header as row 1
+        rejected.insert(0, "row", rejected.index + rows_read + 2)
+        inserted += insert_students(valid.itertuples(index=False, name=None))
+        rows_read += len(chunk)
+        elapsed = time.perf_counter() - started
+        yield {
+            "rows_read": rows_read,
+            "inserted": inserted,
+            "rejected": rejected,
+            "seconds": elapsed,
+            "rows_per_second": rows_read / elapsed if elapsed else 0.0,
+        }
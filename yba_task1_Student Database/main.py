@@ -1,11 +1,75 @@
 import streamlit as st
-from database import setup_database, insert_student, get_all_students, update_student, delete_student
-import pandas as pd
-from io import BytesIO
-
-# Ensure the database and table are set up
-setup_database()
-
+from database import (
+    setup_database, insert_student, update_student, delete_student, iter_students,
+    get_student, search_students,
+)
+from exports import export_csv, export_xlsx
+
+# pandas and the importer are imported by the pages that use them, so the
+# first page load does not wait for them
+
+
+# Set up the database once per server process, not on every rerun
+@st.cache_resource
+def init_database():
+    """
+    Ensures the database and table exist. A failed setup raises, so it is not
+    cached and is retried on the next rerun.
+    """
+    if not setup_database():
+        raise RuntimeError("Could not set up the database. Check the settings in .env.")
+    return True
+
+
+
+
+def search_page(key):
+    """
+    Search box plus keyset pagination over search_students. Only the current
+    page of matches is loaded. Returns (rows, next_cursor, cursors).
+    """
+    name_prefix = st.text_input("Search by name", key=f"{key}_search")
+
+    # Keyset pagination: keep the cursor of every page visited for this search
+    if st.session_state.get(f"{key}_prefix") != name_prefix:
+        st.session_state[f"{key}_prefix"] = name_prefix
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+    rows, next_cursor = search_students(name_prefix, after=cursors[-1])
+    return rows, next_cursor, cursors
+
+
+def page_buttons(key, cursors, next_cursor):
+    """
+    Previous/next page buttons for search_page.
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("Previous page", key=f"{key}_previous"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor is not None and st.button("Next page", key=f"{key}_next"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+
+def student_picker(label, key):
+    """
+    Searchable, paginated student picker. Only the current page of matches is
+    loaded; returns the selected student's id or None.
+    """
+    rows, next_cursor, cursors = search_page(key)
+
+    if not rows:
+        st.info("No matching students found.")
+        return None
+
+    options = {row[0]: f"{row[1]} (ID {row[0]}, age {row[2]}, grade {row[3]})" for row in rows}
+    student_id = st.selectbox(label, list(options), format_func=options.get, key=f"{key}_select")
+
+    page_buttons(key, cursors, next_cursor)
+    return student_id
 
 
 # Streamlit User Interface
@@ -14,7 +78,14 @@ st.set_page_config(page_title="Student Database Management System", layout="wide
 # The rest of your Streamlit code...
 st.title("🎓 Student Database Management System")
 
-menu = ["Add Student", "View Students", "Update Student", "Delete Student"]
+# Ensure the database and table are set up
+try:
+    init_database()
+except RuntimeError as e:
+    st.error(str(e))
+    st.stop()
+
+menu = ["Add Student", "Import Students", "View Students", "Update Student", "Delete Student"]
 choice = st.sidebar.selectbox("Menu", menu)
 
 if choice == "Add Student":
@@ -31,66 +102,108 @@ if choice == "Add Student":
             except Exception as e:
                 st.error(f"Error adding student: {e}")
 
+elif choice == "Import Students":
+    st.subheader("Import Students from CSV or Excel")
+    st.caption("The file needs name, age and grade columns. Invalid rows are skipped and listed below.")
+    uploaded_file = st.file_uploader("Upload file", type=["csv", "xlsx"])
+
+    if uploaded_file is not None and st.button("Import Students"):
+        try:
+            import pandas as pd
+            from importer import count_rows, import_students
+
+            total_rows = count_rows(uploaded_file, uploaded_file.name)
+            progress = st.progress(0.0, text="Importing...")
+            rate = st.empty()
+            rejected_chunks = []
+            stats = None
+            for stats in import_students(uploaded_file, uploaded_file.name):
+                if not stats["rejected"].empty:
+                    rejected_chunks.append(stats["rejected"])
+                if total_rows is None:
+                    # Size unknown: the bar stays empty and only the row count moves
+                    progress.progress(0.0, text=f"Imported {stats['rows_read']:,} rows")
+                else:
+                    done = min(stats["rows_read"] / total_rows, 1.0) if total_rows else 1.0
+                    progress.progress(done, text=f"Imported {stats['rows_read']:,} of {total_rows:,} rows")
+                rate.write(f"{stats['rows_per_second']:,.0f} rows/s")
+
+            if stats is None:
+                st.info("The file is empty: there are no rows to import.")
+            else:
+                progress.progress(1.0, text="Import finished")
+                rejected_count = sum(len(chunk) for chunk in rejected_chunks)
+                st.success(
+                    f"Imported {stats['inserted']:,} students in {stats['seconds']:.1f}s "
+                    f"({stats['rows_per_second']:,.0f} rows/s). {rejected_count:,} rows rejected."
+                )
+            if rejected_chunks:
+                rejects = pd.concat(rejected_chunks, ignore_index=True)
+                st.dataframe(rejects, hide_index=True)
+                st.download_button(
+                    label="Download reject report",
+                    data=rejects.to_csv(index=False).encode("utf-8"),
+                    file_name="rejected_students.csv",
+                    mime="text/csv",
+                )
+        except Exception as e:
+            st.error(f"Error importing students: {e}")
+
 elif choice == "View Students":
     st.subheader("All Students")
     try:
-        df = get_all_students()
-        
-        if not df.empty:
-            st.dataframe(df)
-
-            # Add download buttons for CSV and Excel
-            csv_data = df.to_csv(index=False).encode("utf-8")
-
-            # Generate Excel file in memory using BytesIO
-            excel_buffer = BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
-                df.to_excel(writer, index=False, sheet_name="Students")
-            excel_data = excel_buffer.getvalue()
+        # Only one page of students is loaded and rendered per rerun
+        rows, next_cursor, cursors = search_page("view")
+
+        if rows:
+            st.dataframe(
+                [dict(zip(("id", "name", "age", "grade"), row)) for row in rows],
+                hide_index=True,
+            )
+            page_buttons("view", cursors, next_cursor)
+        elif st.session_state["view_prefix"]:
+            st.info("No matching students found.")
+        else:
+            st.info("No records found!")
 
+        if rows or st.session_state["view_prefix"]:
+            # Exports cover the whole table. They are generated only when a
+            # download button is clicked, streaming rows from the database in chunks.
             # Create two columns to place the download buttons side by side
             col1, col2, col3, col4, col5  = st.columns(5)
             # Download buttons
             with col1:
                 st.download_button(
                     label="Download as CSV",
-                    data=csv_data,
+                    data=lambda: export_csv(iter_students()),
                     file_name="students.csv",
                     mime="text/csv",
                 )
             with col2:
                 st.download_button(
                     label="Download as Excel",
-                    data=excel_data,
+                    data=lambda: export_xlsx(iter_students()),
                     file_name="students.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 )
-        else:
-            st.info("No records found!")
     except Exception as e:
         st.error(f"Error retrieving students: {e}")
 
 elif choice == "Update Student":
     st.subheader("Update Student Details")
     try:
-        df = get_all_students()
-        if not df.empty:
-            st.dataframe(df)
-
-            # Create a dropdown for selecting a student
-            student_names = df["name"].tolist()
-            selected_student = st.selectbox("Select Student to Update", student_names)
-
-            if selected_student:
-                selected_row = df[df["name"] == selected_student].iloc[0]
-                student_id = selected_row["id"]
+        student_id = student_picker("Select Student to Update", "update")
 
+        if student_id is not None:
+            # Load only the selected row, by primary key
+            student = get_student(student_id)
+            if student:
                 # Pre-fill existing data
-                name = st.text_input("Name", selected_row["name"])
+                name = st.text_input("Name", student["name"])
                 age = st.number_input(
-                    "Age", min_value=1, max_value=100, step=1, value=selected_row["age"]
+                    "Age", min_value=1, max_value=100, step=1, value=student["age"]
                 )
-                grade = st.text_input("Grade", selected_row["grade"])
+                grade = st.text_input("Grade", student["grade"])
 
                 if st.button("Update Student"):
                     try:
@@ -98,33 +211,26 @@ elif choice == "Update Student":
                         st.success(f"Student '{name}' updated successfully!")
                     except Exception as e:
                         st.error(f"Error updating student: {e}")
-        else:
-            st.info("No records found!")
+            else:
+                st.info("No records found!")
     except Exception as e:
         st.error(f"Error retrieving students for update: {e}")
 
 elif choice == "Delete Student":
     st.subheader("Delete Student Record")
     try:
-        df = get_all_students()
-        if not df.empty:
-            st.dataframe(df)
-
-            # Create a dropdown for selecting a student
-            student_names = df["name"].tolist()
-            selected_student = st.selectbox("Select Student to Delete", student_names)
-
-            if selected_student:
-                selected_row = df[df["name"] == selected_student].iloc[0]
-                student_id = selected_row["id"]
+        student_id = student_picker("Select Student to Delete", "delete")
 
+        if student_id is not None:
+            student = get_student(student_id)
+            if student:
                 if st.button("Delete Student"):
                     try:
                         delete_student(student_id)
-                        st.success(f"Student '{selected_student}' deleted successfully!")
+                        st.success(f"Student '{student['name']}' deleted successfully!")
                     except Exception as e:
                         st.error(f"Error deleting student: {e}")
-        else:
-            st.info("No records found!")
+            else:
+                st.info("No records found!")
     except Exception as e:
         st.error(f"Error retrieving students for deletion: {e}")
@@ -0,0 +1,163 @@
+"""
+Versioned schema migrations for the student database.
+
+Every migration runs once per database. The versions applied are recorded
+in the schema_migrations table, so when the schema is current migrate()
+only reads the version and runs no DDL.
+
+    python migrations.py            # apply pending migrations, e.g. on deploy
+    python migrations.py status     # show the applied and pending versions
+"""
+import time
+from collections import namedtuple
+
+# apply(cursor, backend, schema) makes the change; it must be safe to re-run
+# on a database that already has it, since versions were not tracked before
+Migration = namedtuple("Migration", "version description apply")
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# MySQL named lock held while migrating, so two processes starting together
+# don't apply the same migration twice
+LOCK_NAME = "student_schema_migration"
+LOCK_TIMEOUT = 60  # seconds
+
+
+def _sql(query, backend):
+    """Adapts %s placeholders to the backend's parameter style."""
+    return query.replace("%s", "?") if backend == "sqlite" else query
+
+
+def _table_exists(cursor, backend, schema, table):
+    if backend == "sqlite":
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    else:
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = %s AND table_name = %s",
+            (schema, table),
+        )
+    return cursor.fetchone()[0] > 0
+
+
+def _index_exists(cursor, backend, schema, table, index):
+    if backend == "sqlite":
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = ?", (index,))
+    else:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = %s AND table_name = %s AND index_name = %s
+        """, (schema, table, index))
+    return cursor.fetchone()[0] > 0
+
+
+def _create_students_table(cursor, backend, schema):
+    if backend == "sqlite":
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS students (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name VARCHAR(100),
+                age INT,
+                grade VARCHAR(10)
+            )
+        """)
+    else:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS students (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(100),
+                age INT,
+                grade VARCHAR(10)
+            )
+        """)
+
+
+def _add_name_index(cursor, backend, schema):
+    # Serves the name search and keyset pagination of the student picker
+    if not _index_exists(cursor, backend, schema, "students", "idx_students_name"):
+        cursor.execute("CREATE INDEX idx_students_name ON students (name)")
+
+
+MIGRATIONS = [
+    Migration(1, "create students table", _create_students_table),
+    Migration(2, "index students by name", _add_name_index),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(cursor, backend, schema):
+    """Highest migration version applied, 0 for a database that predates versioning."""
+    if not _table_exists(cursor, backend, schema, "schema_migrations"):
+        return 0
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return cursor.fetchone()[0]
+
+
+def migrate(conn, backend, schema):
+    """
+    Applies pending migrations in order, committing after each one.
+    Returns a list of (version, description, seconds) for the migrations
+    applied; empty when the schema was already current.
+    """
+    cursor = conn.cursor()
+    try:
+        if schema_version(cursor, backend, schema) >= LATEST_VERSION:
+            return []
+
+        if backend == "mysql":
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+            if cursor.fetchone()[0] != 1:
+                raise TimeoutError(f"Another process has been migrating the schema for over {LOCK_TIMEOUT}s.")
+        try:
+            cursor.execute(SCHEMA_MIGRATIONS_DDL)
+            # Re-read under the lock: another process may have migrated meanwhile
+            current = schema_version(cursor, backend, schema)
+            applied = []
+            for migration in MIGRATIONS:
+                if migration.version <= current:
+                    continue
+                started = time.perf_counter()
+                migration.apply(cursor, backend, schema)
+                cursor.execute(
+                    _sql("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)", backend),
+                    (migration.version, migration.description),
+                )
+                conn.commit()
+                seconds = time.perf_counter() - started
+                applied.append((migration.version, migration.description, seconds))
+                print(f"Applied migration {migration.version}: {migration.description} ({seconds:.3f}s)")
+            return applied
+        finally:
+            if backend == "mysql":
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+                cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def main():
+    import sys
+
+    import database
+
+    if sys.argv[1:] == ["status"]:
+        with database.connection() as conn:
+            cursor = conn.cursor()
+            current = schema_version(cursor, database.DB_BACKEND, database.DB_NAME)
+            cursor.close()
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version <= current else "pending"
+            print(f"{migration.version:>4}  {state:<8} {migration.description}")
+    elif database.setup_database():
+        print(f"Schema is at version {LATEST_VERSION}.")
+    else:
+        raise SystemExit("Migration failed.")
+
+
+if __name__ == "__main__":
+    main()
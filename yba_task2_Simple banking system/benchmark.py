@@ -0,0 +1,726 @@
+"""
+Headless benchmarks for the banking data layer.
+
+Runs against the database configured in .env (DB_HOST, DB_USER, DB_PASSWORD,
+DB_NAME); point DB_NAME at a scratch database, benchmarks create their own rows.
+
+    python benchmark.py ingest --postings 10000 --chunk-size 1000
+    python benchmark.py roster --sizes 10000 100000 1000000
+    python benchmark.py startup --reruns 10
+    python benchmark.py schema --repeat 50
+    python benchmark.py load --tellers 8 --ops 500 --accounts 50 --json load.json
+    python benchmark.py contention --tellers 8 --ops 200 --hot 1 4 16
+    python benchmark.py reconcile --postings 1000000 --new-postings 10000
+    python benchmark.py interest --sizes 10000 100000 1000000 --post 10000
+    python benchmark.py archive --accounts 500 --rows 200 --batch-size 100
+    python benchmark.py login --cost 16384 --workers 1 2 4 8 --users 100
+
+The roster, interest and login benchmarks run in memory on synthetic rows and needs no database.
+The load benchmark drives BankingSystem from concurrent teller threads and
+exits non-zero if the ledger does not add up afterwards.
+The startup benchmark runs demo.py headless with Streamlit's AppTest, each
+page in a fresh interpreter.
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import interest
+import migrations
+import passwords
+import reconcile
+from demo import (
+    DB_NAME,
+    DB_POOL_SIZE,
+    FETCH_CHUNK_SIZE,
+    BalanceConflictError,
+    BankAccount,
+    BankingSystem,
+    DBConnection,
+    build_account_roster,
+    calculate_interest,
+    change_balance,
+    close_accounts,
+    connect_db,
+    create_account,
+    format_account_roster,
+    get_account,
+    growth_factor,
+    post_transactions,
+    save_transaction,
+    set_password,
+    setup_database,
+    to_money,
+    transfer_between_accounts,
+    update_account_balance,
+    validate_user,
+)
+from metrics import query_metrics, start_operation
+
+
+def create_benchmark_accounts(count, initial_balance=1000, account_type="Checking"):
+    return [create_account(f"Benchmark {i}", initial_balance, account_type) for i in range(count)]
+
+
+def random_postings(account_numbers, count, seed=42):
+    rng = random.Random(seed)
+    return [
+        (rng.choice(account_numbers), rng.choice(("Deposit", "Withdrawal")), to_money(rng.uniform(1, 50)))
+        for _ in range(count)
+    ]
+
+
+def report(label, rows, seconds):
+    rate = rows / seconds if seconds else float("inf")
+    print(f"{label:<24} {rows:>8} rows  {seconds:>8.3f}s  {rate:>10.1f} rows/s")
+
+
+def post_one_by_one(postings):
+    """The per-row path: one balance update and one ledger insert per posting."""
+    balances = {}
+    for account_number, transaction_type, amount in postings:
+        if account_number not in balances:
+            balances[account_number] = Decimal(get_account(account_number)["initial_balance"])
+        if transaction_type == "Withdrawal":
+            if amount > balances[account_number]:
+                continue
+            balances[account_number] -= amount
+        else:
+            balances[account_number] += amount
+        update_account_balance(account_number, balances[account_number])
+        save_transaction(account_number, transaction_type, amount, balances[account_number])
+
+
+def bench_ingest(args):
+    account_numbers = create_benchmark_accounts(args.accounts)
+    postings = random_postings(account_numbers, args.postings)
+
+    started = time.perf_counter()
+    post_one_by_one(postings)
+    report("per-row", len(postings), time.perf_counter() - started)
+
+    started = time.perf_counter()
+    result = post_transactions(postings, chunk_size=args.chunk_size)
+    report(f"bulk (chunk={args.chunk_size})", len(postings), time.perf_counter() - started)
+
+    rates = [chunk["rows_per_second"] for chunk in result["chunks"]]
+    print(f"  chunks: {len(rates)}  min {min(rates):.1f}  max {max(rates):.1f} rows/s  "
+          f"rejected: {len(result['rejected'])}")
+
+
+def synthetic_account_rows(count, seed=42):
+    """Rows shaped like the roster query: (account_number, holder, balance_cents, type)."""
+    rng = random.Random(seed)
+    types = ("Checking", "Savings", "Business")
+    return [(i + 1, f"Holder {i}", rng.randrange(0, 10_000_000), rng.choice(types)) for i in range(count)]
+
+
+def roster_from_objects(rows):
+    """The previous path: one BankAccount per row, then per-row formatting."""
+    accounts = [
+        BankAccount(number, holder, Decimal(cents) / 100, account_type)
+        for number, holder, cents, account_type in rows
+    ]
+    return pd.DataFrame({
+        "Account Number": [str(account.account_number).zfill(7) for account in accounts],
+        "Account Holder": [account.account_holder for account in accounts],
+        "Balance": [f"${account.get_balance():.2f}" for account in accounts],
+        "Account Type": [account.account_type for account in accounts],
+    })
+
+
+def roster_from_columns(rows):
+    chunks = (rows[i:i + FETCH_CHUNK_SIZE] for i in range(0, len(rows), FETCH_CHUNK_SIZE))
+    return format_account_roster(build_account_roster(chunks))
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_roster(args):
+    print(f"{'accounts':>10}  {'path':<8} {'seconds':>9} {'peak MiB':>9}")
+    for size in args.sizes:
+        rows = synthetic_account_rows(size)
+        for label, function in (("objects", roster_from_objects), ("columns", roster_from_columns)):
+            elapsed, peak = measure(function, rows)
+            print(f"{size:>10}  {label:<8} {elapsed:>9.3f} {peak / 2**20:>9.1f}")
+
+
+# Runs in a fresh interpreter so the first run pays for every import, like a new server process
+STARTUP_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+app, page, reruns = sys.argv[1], json.loads(sys.argv[2]), int(sys.argv[3])
+at = AppTest.from_file(app, default_timeout=120)
+for key, value in page.get("session_state", {}).items():
+    at.session_state[key] = value
+
+def timed_run():
+    started = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    return time.perf_counter() - started
+
+cold = timed_run()
+first_visit = cold
+if "widget" in page:
+    kind, index, value = page["widget"]
+    root = at.sidebar if page.get("sidebar") else at
+    getattr(root, kind)[index].set_value(value)
+    first_visit = timed_run()
+warm = [timed_run() for _ in range(reruns)]
+print(json.dumps({"cold": cold, "first_visit": first_visit, "warm": warm}))
+"""
+
+LOGGED_IN = {"logged_in": True}
+STARTUP_PAGES = {
+    "Login": {},
+    "Create Account": {"session_state": LOGGED_IN},
+    "Account Operations": {"session_state": LOGGED_IN, "sidebar": True, "widget": ["radio", 0, "Account Operations"]},
+    "View All Accounts": {"session_state": LOGGED_IN, "sidebar": True, "widget": ["radio", 0, "View All Accounts"]},
+    "Transfer": {"session_state": LOGGED_IN, "sidebar": True, "widget": ["radio", 0, "Transfer Between Accounts"]},
+    "Close Account": {"session_state": LOGGED_IN, "sidebar": True, "widget": ["radio", 0, "Close Account"]},
+}
+
+
+def bench_startup(args):
+    print(f"{'page':<20} {'cold start ms':>14} {'first visit ms':>15} {'warm rerun ms':>14}")
+    for name, page in STARTUP_PAGES.items():
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE, "demo.py", json.dumps(page), str(args.reruns)],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise SystemExit(f"{name}: {result.stderr.strip() or result.stdout.strip()}")
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"{name:<20} {timings['cold'] * 1000:>14.0f} {timings['first_visit'] * 1000:>15.0f} "
+            f"{statistics.median(timings['warm']) * 1000:>14.1f}"
+        )
+
+
+def bench_schema(args):
+    def full_ddl():
+        # What every rerun used to do before the schema was versioned
+        with connect_db(use_database=False) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
+            conn.database = DB_NAME
+            for migration in migrations.MIGRATIONS:
+                migration.apply(cursor, DB_NAME)
+            cursor.close()
+
+    for label, function in (("full DDL", full_ddl), ("version check", setup_database)):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            function()
+        print(f"{label:<14} {(time.perf_counter() - started) / args.repeat * 1000:>8.2f} ms per call")
+    print("Reruns now call neither: demo.py runs setup_database once per process (st.cache_resource).")
+
+
+# Relative weights of the operations a simulated teller performs
+LOAD_MIX = {"deposit": 40, "withdraw": 35, "transfer": 20, "close": 5}
+
+
+class Teller:
+    """
+    One simulated teller: performs random operations on the shared pool of
+    benchmark accounts through BankingSystem, like the Streamlit pages do,
+    and records each operation's latency and outcome.
+    """
+
+    def __init__(self, accounts, lock, initial_balance, seed):
+        self.banking_system = BankingSystem()
+        self.accounts = accounts  # shared between tellers, guarded by lock
+        self.lock = lock
+        self.initial_balance = initial_balance
+        self.rng = random.Random(seed)
+        self.latencies = defaultdict(list)  # operation -> seconds
+        self.outcomes = defaultdict(lambda: defaultdict(int))  # operation -> outcome -> count
+        # Money that entered or left the bank through this teller
+        self.deposited = Decimal("0.00")
+        self.withdrawn = Decimal("0.00")
+        self.opened = Decimal("0.00")
+
+    def pick(self, count=1):
+        with self.lock:
+            return self.rng.sample(self.accounts, count)
+
+    def amount(self):
+        return to_money(self.rng.uniform(1, 100))
+
+    def deposit(self):
+        account = self.banking_system.get_account(self.pick()[0])
+        if account is None:
+            return "missing"
+        amount = self.amount()
+        if not account.deposit(amount):
+            return "rejected"
+        self.deposited += amount
+        return "ok"
+
+    def withdraw(self):
+        account = self.banking_system.get_account(self.pick()[0])
+        if account is None:
+            return "missing"
+        amount = self.amount()
+        if not account.withdraw(amount):
+            return "rejected"
+        self.withdrawn += amount
+        return "ok"
+
+    def transfer(self):
+        source, dest = self.pick(2)
+        if not transfer_between_accounts(self.banking_system, source, dest, self.amount()):
+            return "rejected"
+        return "ok"
+
+    def close(self):
+        """Pays out the balance, closes the account and opens a new one in its place."""
+        account_number = self.pick()[0]
+        account = self.banking_system.get_account(account_number)
+        if account is None:
+            return "missing"
+        balance = account.get_balance()
+        if balance > 0:
+            if not account.withdraw(balance):
+                return "rejected"
+            self.withdrawn += balance
+        if not self.banking_system.close_account(account_number):
+            return "rejected"
+        replacement = self.banking_system.create_account("Benchmark load", self.initial_balance, "Checking")
+        self.opened += self.initial_balance
+        with self.lock:
+            if account_number in self.accounts:
+                self.accounts[self.accounts.index(account_number)] = replacement
+            else:  # another teller closed the same account at the same moment
+                self.accounts.append(replacement)
+        return "ok"
+
+    def run(self, ops):
+        operations = list(LOAD_MIX)
+        weights = list(LOAD_MIX.values())
+        for operation in self.rng.choices(operations, weights, k=ops):
+            start_operation(f"load: {operation}")
+            started = time.perf_counter()
+            try:
+                outcome = getattr(self, operation)()
+            except Exception as err:
+                outcome = f"error: {type(err).__name__}"
+            self.latencies[operation].append(time.perf_counter() - started)
+            self.outcomes[operation][outcome] += 1
+        return self
+
+
+def latency_summary(seconds):
+    """Nearest-rank p50/p95/p99 of a list of latencies, in milliseconds."""
+    ordered = sorted(seconds)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {
+        f"p{q}_ms": ordered[max(0, -(-len(ordered) * q // 100) - 1)] * 1000
+        for q in (50, 95, 99)
+    }
+
+
+def check_ledger(account_numbers, initial_balance):
+    """
+    Compares every account's stored balance with its opening balance plus
+    its ledger deposits minus withdrawals. Returns (total_balance, mismatches)
+    where mismatches holds (account_number, balance, expected) tuples.
+    """
+    placeholders = ", ".join(["%s"] * len(account_numbers))
+    with DBConnection() as cursor:
+        cursor.execute(f"""
+            SELECT a.account_number, a.initial_balance AS balance,
+                   COALESCE(SUM(CASE t.transaction_type WHEN 'Deposit' THEN t.amount ELSE -t.amount END), 0) AS net
+            FROM accounts a
+            LEFT JOIN transactions t ON t.account_number = a.account_number
+            WHERE a.account_number IN ({placeholders})
+            GROUP BY a.account_number, a.initial_balance
+        """, tuple(account_numbers))
+        rows = cursor.fetchall()
+    total = sum((Decimal(row["balance"]) for row in rows), Decimal("0.00"))
+    mismatches = [
+        (row["account_number"], Decimal(row["balance"]), initial_balance + Decimal(row["net"]))
+        for row in rows
+        if Decimal(row["balance"]) != initial_balance + Decimal(row["net"])
+    ]
+    return total, mismatches
+
+
+def bench_load(args):
+    # Streamlit warns on every st.* call made outside `streamlit run`
+    logging.disable(logging.WARNING)
+    # Session state is one shared dict outside `streamlit run`; deposit() and
+    # withdraw() copy their balance onto the selected account, so point that
+    # at a placeholder rather than at an account another teller is using
+    st.session_state.selected_account = BankAccount(0, "Benchmark teller")
+
+    initial_balance = to_money(args.initial_balance)
+    accounts = create_benchmark_accounts(args.accounts, initial_balance)
+    opened = initial_balance * len(accounts)
+    lock = threading.Lock()
+    tellers = [Teller(accounts, lock, initial_balance, args.seed + i) for i in range(args.tellers)]
+
+    query_metrics.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.tellers) as pool:
+        list(pool.map(lambda teller: teller.run(args.ops), tellers))
+    elapsed = time.perf_counter() - started
+
+    latencies, outcomes = defaultdict(list), defaultdict(lambda: defaultdict(int))
+    for teller in tellers:
+        for operation, seconds in teller.latencies.items():
+            latencies[operation] += seconds
+        for operation, counts in teller.outcomes.items():
+            for outcome, count in counts.items():
+                outcomes[operation][outcome] += count
+    total_ops = sum(len(seconds) for seconds in latencies.values())
+
+    results = {
+        "tellers": args.tellers,
+        "accounts": args.accounts,
+        "ops": total_ops,
+        "seconds": elapsed,
+        "ops_per_second": total_ops / elapsed if elapsed else 0.0,
+        "operations": {},
+    }
+    print(f"{args.tellers} tellers, {args.accounts} accounts: {total_ops} ops in {elapsed:.2f}s "
+          f"= {results['ops_per_second']:.1f} ops/s over {DB_POOL_SIZE} pooled connections")
+    print(f"{'operation':<10} {'ops':>7} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  outcomes")
+    latencies["all"] = [value for operation in LOAD_MIX for value in latencies[operation]]
+    for operation in [*LOAD_MIX, "all"]:
+        seconds = latencies[operation]
+        counts = dict(outcomes[operation]) if operation != "all" else {}
+        summary = latency_summary(seconds)
+        results["operations"][operation] = {"ops": len(seconds), **summary, "outcomes": counts}
+        print(f"{operation:<10} {len(seconds):>7} {len(seconds) / elapsed:>8.1f} {summary['p50_ms']:>8.1f} "
+              f"{summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f}  "
+              + ", ".join(f"{outcome} {count}" for outcome, count in sorted(counts.items())))
+
+    acquire = query_metrics.acquire_summary()
+    print(f"connection wait: mean {acquire['mean_ms']:.1f} ms, p95 {acquire['p95_ms']:.1f} ms, "
+          f"max {acquire['max_ms']:.1f} ms; slow queries: {len(query_metrics.recent_slow_queries())}")
+    for row in query_metrics.operation_table():
+        if row["operation"].startswith("load: "):
+            print(f"  {row['operation']:<16} {row['queries_per_request']:>5.1f} queries "
+                  f"{row['round_trips_per_request']:>5.1f} round trips per op")
+    results["connection_wait"] = acquire
+
+    # Ledger invariant: per account, and for the money held by the bank as a whole
+    total, mismatches = check_ledger(accounts, initial_balance)
+    opened += sum(teller.opened for teller in tellers)
+    expected_total = (
+        opened
+        + sum(teller.deposited for teller in tellers)
+        - sum(teller.withdrawn for teller in tellers)
+    )
+    results["ledger_mismatches"] = len(mismatches)
+    results["bank_total"] = str(total)
+    results["bank_total_expected"] = str(expected_total)
+    for account_number, balance, expected in mismatches[:10]:
+        print(f"  account {account_number}: balance {balance}, ledger says {expected}")
+    print(f"ledger: {len(mismatches)} of {len(accounts)} accounts disagree with their transactions; "
+          f"bank holds {total}, tellers moved it to {expected_total}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if mismatches or total != expected_total:
+        raise SystemExit("Ledger invariant violated.")
+
+
+def blind_deposit(account_number, amount):
+    """The previous BankAccount.deposit: read, add in Python, write the result back."""
+    balance = Decimal(get_account(account_number)["initial_balance"]) + amount
+    update_account_balance(account_number, balance)
+    save_transaction(account_number, "Deposit", amount, balance)
+
+
+def versioned_deposit(account_number, amount):
+    account = get_account(account_number)
+    change_balance(account_number, "Deposit", amount, Decimal(account["initial_balance"]), account["version"])
+
+
+def bench_contention(args):
+    print(f"{args.tellers} tellers x {args.ops} deposits spread over a few hot accounts")
+    print(f"{'hot':>4}  {'path':<18} {'ops/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'retries/op':>10} {'failed':>7}  lost")
+    for hot in args.hot:
+        for label, deposit in (("read-modify-write", blind_deposit), ("versioned", versioned_deposit)):
+            accounts = create_benchmark_accounts(hot, 0)
+            query_metrics.reset()
+
+            def teller(seed):
+                start_operation(label)
+                rng = random.Random(seed)
+                latencies, deposited, failed = [], Decimal("0.00"), 0
+                for _ in range(args.ops):
+                    amount = to_money(rng.uniform(1, 100))
+                    started = time.perf_counter()
+                    try:
+                        deposit(rng.choice(accounts), amount)
+                        deposited += amount
+                    except BalanceConflictError:
+                        failed += 1
+                    latencies.append(time.perf_counter() - started)
+                return latencies, deposited, failed
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.tellers) as pool:
+                results = list(pool.map(teller, range(args.seed, args.seed + args.tellers)))
+            elapsed = time.perf_counter() - started
+
+            latencies = [value for result in results for value in result[0]]
+            deposited = sum(result[1] for result in results)
+            failed = sum(result[2] for result in results)
+            held = sum(Decimal(get_account(account_number)["initial_balance"]) for account_number in accounts)
+            retries = sum(row["retries"] for row in query_metrics.operation_table() if row["operation"] == label)
+            summary = latency_summary(latencies)
+            # Money deposited that the balances don't show: overwritten by a concurrent write
+            print(f"{hot:>4}  {label:<18} {len(latencies) / elapsed:>8.1f} {summary['p50_ms']:>8.1f} "
+                  f"{summary['p99_ms']:>8.1f} {retries / len(latencies):>10.2f} {failed:>7}  {deposited - held}")
+
+
+def bench_reconcile(args):
+    account_numbers = create_benchmark_accounts(args.accounts)
+    post_transactions(random_postings(account_numbers, args.postings), chunk_size=10000)
+
+    # A full pass also writes the snapshots the incremental pass starts from
+    full = reconcile.reconcile(full=True)
+    report("full ledger", full["ledger_rows"], full["seconds"])
+
+    post_transactions(random_postings(account_numbers, args.new_postings, seed=7), chunk_size=10000)
+
+    # The incremental pass only pays off if the ledger is read through the
+    # (account_number, transaction_id) index
+    plan = [row for row in reconcile.explain_ledger_query() if row["table"] == "t"]
+    for row in plan:
+        print(f"  plan for transactions: type={row['type']} key={row['key']} extra={row['Extra']}")
+    if not plan or plan[0]["key"] != "idx_transactions_account_id":
+        raise SystemExit("The reconciliation ledger query does not use idx_transactions_account_id.")
+
+    incremental = reconcile.reconcile()
+    report("since snapshots", incremental["ledger_rows"], incremental["seconds"])
+    print(f"  accounts: {incremental['accounts']}  mismatches: {len(full['mismatches'])} full, "
+          f"{len(incremental['mismatches'])} incremental")
+
+
+def bench_interest(args):
+    growth = growth_factor(args.rate, 12, 1)
+    print(f"one month at {args.rate}%: growth factor {growth}")
+    print(f"{'accounts':>10}  {'decimal loop s':>14} {'vectorized s':>13} {'speedup':>8}")
+    for size in args.sizes:
+        rng = np.random.default_rng(42)
+        # Mostly ordinary balances plus the extremes DECIMAL(10, 2) allows
+        cents = np.concatenate((rng.integers(1, 10_000_000, size - 2), [1, 9_999_999_999]))
+
+        started = time.perf_counter()
+        expected = [calculate_interest(Decimal(balance).scaleb(-2), growth) for balance in cents.tolist()]
+        loop_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = interest.interest_cents(cents, growth)
+        vector_seconds = time.perf_counter() - started
+
+        if [Decimal(value).scaleb(-2) for value in result.tolist()] != expected:
+            raise SystemExit("Vectorized interest differs from calculate_interest.")
+        print(f"{size:>10}  {loop_seconds:>14.3f} {vector_seconds:>13.4f} {loop_seconds / vector_seconds:>7.0f}x")
+
+    if args.post:
+        setup_database()
+        create_benchmark_accounts(args.post, 1000, "Savings")
+        dry = interest.post_interest(args.rate, dry_run=True)
+        print(f"dry run: {dry['eligible']} Savings accounts read and computed in {dry['computed_seconds']:.3f}s")
+        posted = interest.post_interest(args.rate)
+        report("interest posting", posted["posting"]["posted"], posted["seconds"])
+
+
+def create_closable_accounts(count, rows):
+    """Zero-balance accounts with rows ledger entries each (deposit/withdrawal pairs)."""
+    account_numbers = create_benchmark_accounts(count, 0)
+    amount = Decimal("10.00")
+    postings = [
+        (account_number, transaction_type, amount)
+        for account_number in account_numbers
+        for _ in range(rows // 2)
+        for transaction_type in ("Deposit", "Withdrawal")
+    ]
+    post_transactions(postings, chunk_size=10000)
+    return account_numbers
+
+
+def delete_one_by_one(account_numbers):
+    """The previous close_account: delete the ledger and the account, one account per transaction."""
+    for account_number in account_numbers:
+        with DBConnection() as cursor:
+            cursor.execute("DELETE FROM transactions WHERE account_number = %s", (account_number,))
+            cursor.execute("DELETE FROM accounts WHERE account_number = %s", (account_number,))
+
+
+def bench_archive(args):
+    rows = args.rows // 2 * 2
+    print(f"closing {args.accounts} zero-balance accounts with {rows} ledger rows each")
+    print(f"{'path':<24} {'seconds':>8} {'accounts/s':>11} {'rows/s':>10}")
+    paths = (
+        ("delete, per account", delete_one_by_one),
+        ("archive, per account", lambda numbers: close_accounts(numbers, batch_size=1)),
+        (f"archive, batch={args.batch_size}", lambda numbers: close_accounts(numbers, batch_size=args.batch_size)),
+    )
+    for label, close in paths:
+        account_numbers = create_closable_accounts(args.accounts, rows)
+        started = time.perf_counter()
+        close(account_numbers)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<24} {elapsed:>8.2f} {len(account_numbers) / elapsed:>11.1f} "
+              f"{len(account_numbers) * rows / elapsed:>10.0f}")
+
+
+def bench_login(args):
+    password = "benchmark password"
+    stored = passwords.hash_password(password, n=args.cost)
+    started = time.perf_counter()
+    passwords.verify_password(password, stored)
+    print(f"scrypt n={args.cost}: {(time.perf_counter() - started) * 1000:.1f} ms and "
+          f"{128 * args.cost * passwords.SCRYPT_R / 2**20:.0f} MiB per check")
+
+    def timed_check():
+        passwords.verify_password(password, stored)
+        return time.perf_counter()
+
+    # A burst of logins arriving together; latency includes waiting for a worker
+    print(f"{args.logins} logins at once")
+    print(f"{'workers':>8} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'peak MiB':>9}")
+    for workers in args.workers:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            started = time.perf_counter()
+            futures = [pool.submit(timed_check) for _ in range(args.logins)]
+            latencies = [future.result() - started for future in futures]
+        elapsed = time.perf_counter() - started
+        summary = latency_summary(latencies)
+        print(f"{workers:>8} {args.logins / elapsed:>9.1f} {summary['p50_ms']:>8.0f} {summary['p99_ms']:>8.0f} "
+              f"{workers * 128 * args.cost * passwords.SCRYPT_R / 2**20:>9.0f}")
+
+    if args.users:
+        # End to end through validate_user, at the PASSWORD_SCRYPT_N cost and PASSWORD_VERIFY_WORKERS pool
+        setup_database()
+        usernames = [f"benchmark{i}" for i in range(args.users)]
+        for username in usernames:
+            set_password(username, password)
+
+        def login(seed):
+            rng = random.Random(seed)
+            latencies = []
+            for _ in range(args.logins // args.tellers):
+                started = time.perf_counter()
+                if not validate_user(rng.choice(usernames), password):
+                    raise SystemExit("Benchmark login failed.")
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.tellers) as pool:
+            latencies = [value for result in pool.map(login, range(args.tellers)) for value in result]
+        elapsed = time.perf_counter() - started
+        summary = latency_summary(latencies)
+        print(f"validate_user, {args.tellers} sessions, {passwords.VERIFY_WORKERS} workers, n={passwords.SCRYPT_N}: "
+              f"{len(latencies) / elapsed:.1f} logins/s, p50 {summary['p50_ms']:.0f} ms, p99 {summary['p99_ms']:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="per-row vs bulk ledger postings")
+    ingest.add_argument("--accounts", type=int, default=100)
+    ingest.add_argument("--postings", type=int, default=10000)
+    ingest.add_argument("--chunk-size", type=int, default=1000)
+    ingest.set_defaults(run=bench_ingest)
+
+    roster = commands.add_parser("roster", help="object vs columnar account roster (no database)")
+    roster.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    roster.set_defaults(run=bench_roster, needs_db=False)
+
+    startup = commands.add_parser("startup", help="cold start and warm rerun time of each page of demo.py")
+    startup.add_argument("--reruns", type=int, default=10)
+    startup.set_defaults(run=bench_startup)
+
+    schema = commands.add_parser("schema", help="per-rerun DDL vs a schema version check")
+    schema.add_argument("--repeat", type=int, default=50)
+    schema.set_defaults(run=bench_schema)
+
+    load = commands.add_parser("load", help="concurrent tellers: throughput, latency and the ledger invariant")
+    load.add_argument("--tellers", type=int, default=8)
+    load.add_argument("--ops", type=int, default=500, help="operations per teller")
+    load.add_argument("--accounts", type=int, default=50)
+    load.add_argument("--initial-balance", default="1000.00")
+    load.add_argument("--seed", type=int, default=42)
+    load.add_argument("--json", help="also write the results to this file")
+    load.set_defaults(run=bench_load)
+
+    contention = commands.add_parser("contention", help="read-modify-write vs versioned deposits on hot accounts")
+    contention.add_argument("--tellers", type=int, default=8)
+    contention.add_argument("--ops", type=int, default=200, help="deposits per teller")
+    contention.add_argument("--hot", type=int, nargs="+", default=[1, 4, 16], help="numbers of hot accounts")
+    contention.add_argument("--seed", type=int, default=42)
+    contention.set_defaults(run=bench_contention)
+
+    reconciliation = commands.add_parser("reconcile", help="full vs incremental ledger reconciliation")
+    reconciliation.add_argument("--accounts", type=int, default=1000)
+    reconciliation.add_argument("--postings", type=int, default=100_000, help="ledger rows before the snapshots")
+    reconciliation.add_argument("--new-postings", type=int, default=1000, help="ledger rows after the snapshots")
+    reconciliation.set_defaults(run=bench_reconcile)
+
+    interest_rates = commands.add_parser("interest", help="per-account Decimal vs vectorized interest, and posting")
+    interest_rates.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    interest_rates.add_argument("--rate", default="2.5", help="annual interest rate in percent")
+    interest_rates.add_argument("--post", type=int, default=0,
+                                help="also create this many Savings accounts and post their interest (needs the database)")
+    interest_rates.set_defaults(run=bench_interest, needs_db=False)
+
+    archive = commands.add_parser("archive", help="deleting vs archiving the ledger of closed accounts")
+    archive.add_argument("--accounts", type=int, default=500)
+    archive.add_argument("--rows", type=int, default=200, help="ledger rows per account")
+    archive.add_argument("--batch-size", type=int, default=100, help="accounts closed per transaction")
+    archive.set_defaults(run=bench_archive)
+
+    login = commands.add_parser("login", help="password verification throughput at a fixed scrypt cost")
+    login.add_argument("--cost", type=int, default=passwords.SCRYPT_N, help="scrypt n")
+    login.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="verification pool sizes")
+    login.add_argument("--logins", type=int, default=64)
+    login.add_argument("--users", type=int, default=0,
+                       help="also log this many users in through validate_user (needs the database)")
+    login.add_argument("--tellers", type=int, default=8, help="concurrent sessions for --users")
+    login.set_defaults(run=bench_login, needs_db=False)
+
+    args = parser.parse_args()
+    if getattr(args, "needs_db", True):
+        setup_database()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+# Process-wide cache registry, kept in an imported module so it survives Streamlit reruns
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache whose entries also expire after ttl seconds.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        # key -> [loads in flight, invalidations seen], for keys being loaded
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def _set_locked(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key, value):
+        with self._lock:
+            self._set_locked(key, value)
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value for key, calling loader() and caching its
+        result on a miss. If key is invalidated while loader() runs, the result
+        may predate the write, so it is returned but not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            with self._lock:
+                state = self._loading.setdefault(key, [0, 0])
+                state[0] += 1
+                generation = state[1]
+            loaded = False
+            try:
+                value = loader()
+                loaded = True
+            finally:
+                with self._lock:
+                    if loaded and state[1] == generation:
+                        self._set_locked(key, value)
+                    state[0] -= 1
+                    if state[0] == 0:
+                        del self._loading[key]
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                if key in self._loading:
+                    self._loading[key][1] += 1
+                if self._data.pop(key, _MISSING) is not _MISSING:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for state in self._loading.values():
+                state[1] += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def get_cache(name, **options):
+    """Returns the process-wide cache registered under name, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = TTLCache(**options)
+            _caches[name] = cache
+        return cache
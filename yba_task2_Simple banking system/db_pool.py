@@ -0,0 +1,203 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+# Process-wide pool registry. Streamlit re-executes the app script on every
+# rerun, so pools must live in an imported module to survive between reruns.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def default_health_check(conn):
+    """
+    Returns True if the connection is still usable.
+    MySQL connections are pinged; anything else (e.g. sqlite3) runs SELECT 1.
+    """
+    try:
+        if hasattr(conn, "is_connected"):
+            return conn.is_connected()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class ConnectionPool:
+    """
+    A small thread-safe connection pool.
+
+    connect is a zero-argument factory returning a new DB-API connection, so the
+    same pool works for mysql.connector and sqlite3.
+    """
+
+    def __init__(self, connect, size=5, max_idle=300, checkout_timeout=10,
+                 health_check=default_health_check):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self._connect = connect
+        self.size = size
+        self.max_idle = max_idle
+        self.checkout_timeout = checkout_timeout
+        self._health_check = health_check
+        self._idle = []  # (connection, last_used) pairs, most recently used last
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "health_check_failures": 0,
+            "evicted_idle": 0,
+            "discarded": 0,
+        }
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle_locked(self, now):
+        if self.max_idle is None:
+            return []
+        keep, evicted = [], []
+        for conn, last_used in self._idle:
+            if now - last_used > self.max_idle:
+                evicted.append(conn)
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+        self._stats["evicted_idle"] += len(evicted)
+        return evicted
+
+    def evict_idle(self):
+        """Closes connections that have been idle longer than max_idle."""
+        with self._cond:
+            evicted = self._evict_idle_locked(time.monotonic())
+        for conn in evicted:
+            self._close_quietly(conn)
+        return len(evicted)
+
+    def acquire(self):
+        """Checks out a healthy connection, creating one if the pool has room."""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            conn = None
+            with self._cond:
+                evicted = self._evict_idle_locked(time.monotonic())
+                while not self._idle and self._in_use >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"No database connection available after {self.checkout_timeout}s "
+                            f"(pool size {self.size})."
+                        )
+                    self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                self._in_use += 1
+                self._stats["checkouts"] += 1
+            for stale in evicted:
+                self._close_quietly(stale)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                with self._cond:
+                    self._stats["created"] += 1
+                return conn
+
+            if self._health_check is None or self._health_check(conn):
+                with self._cond:
+                    self._stats["reused"] += 1
+                return conn
+
+            # Dead connection: drop it and try again with the same slot freed
+            self._close_quietly(conn)
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def release(self, conn, discard=False):
+        """
+        Returns a connection to the pool, or closes it if discard is True or
+        the pool has been closed.
+        """
+        with self._cond:
+            discard = discard or self._closed
+        if discard:
+            self._close_quietly(conn)
+            with self._cond:
+                self._stats["discarded"] += 1
+            self._release_slot()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self):
+        """Returns a snapshot of pool counters and current occupancy."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update(size=self.size, in_use=self._in_use, idle=len(self._idle))
+        return snapshot
+
+    def close_all(self):
+        """Closes every idle connection. Checked-out connections close on release."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+
+def get_pool(name, connect, **options):
+    """Returns the process-wide pool registered under name, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = ConnectionPool(connect, **options)
+            _pools[name] = pool
+        return pool
+
+
+def close_pool(name):
+    """Closes and forgets the pool registered under name."""
+    with _pools_lock:
+        pool = _pools.pop(name, None)
+    if pool is not None:
+        pool.close_all()
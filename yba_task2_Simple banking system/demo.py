@@ -2,11 +2,17 @@ import mysql.connector
 from datetime import datetime
 from dotenv import load_dotenv
 import os
+import random
+import time
+from array import array
 from mysql.connector import Error
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP, localcontext
 import streamlit as st
-from decimal import Decimal
-import pandas as pd
+from db_pool import get_pool
+from cache import get_cache
+from migrations import migrate
+from metrics import InstrumentedCursor, SLOW_QUERY_MS, query_metrics, start_operation
+from passwords import check_password, hash_password, needs_rehash, unknown_user_hash
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,6 +23,43 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 
+# Monetary amounts are stored with two decimal places
+CENTS = Decimal("0.01")
+
+# Largest balance the DECIMAL(10, 2) balance columns can hold
+MAX_BALANCE = Decimal("99999999.99")
+
+# Interest growth factors are rounded to this many decimal places
+GROWTH_DECIMALS = 12
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_IDLE = int(os.getenv("DB_POOL_MAX_IDLE", "300"))  # seconds
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds
+
+# Number of transactions shown per history page
+HISTORY_PAGE_SIZE = 50
+
+# Account lookup cache settings
+ACCOUNT_CACHE_SIZE = int(os.getenv("ACCOUNT_CACHE_SIZE", "1024"))
+ACCOUNT_CACHE_TTL = float(os.getenv("ACCOUNT_CACHE_TTL", "30"))  # seconds
+ALL_ACCOUNTS_KEY = "all_accounts"
+ROSTER_KEY = "account_roster"
+ACCOUNT_NUMBERS_KEY = "account_numbers"
+
+# Rows fetched per round trip when streaming large result sets
+FETCH_CHUNK_SIZE = 10000
+
+# Closing accounts: ledger rows copied to the archive per transaction, and
+# accounts closed per transaction
+ARCHIVE_CHUNK_SIZE = 5000
+CLOSE_BATCH_SIZE = 100
+
+# Deposits and withdrawals retry this many times when another write to the
+# same account gets in first, waiting a random 0..backoff, doubling each time
+BALANCE_WRITE_RETRIES = int(os.getenv("BALANCE_WRITE_RETRIES", "10"))
+BALANCE_RETRY_BACKOFF = 0.005  # seconds
+
 # Connect to MySQL Database
 def connect_db(use_database=True):
     """
@@ -35,76 +78,132 @@ def connect_db(use_database=True):
         print(f"Error creating connection: {err}")
         raise
 
+# Shared connection pool for the banking database
+def get_db_pool():
+    """
+    Returns the process-wide connection pool, creating it on first use.
+    """
+    return get_pool(
+        "banking",
+        connect_db,
+        size=DB_POOL_SIZE,
+        max_idle=DB_POOL_MAX_IDLE,
+        checkout_timeout=DB_POOL_TIMEOUT,
+    )
+
+# Shared cache for account lookups
+def get_account_cache():
+    """
+    Returns the process-wide account cache, creating it on first use.
+    """
+    return get_cache("accounts", maxsize=ACCOUNT_CACHE_SIZE, ttl=ACCOUNT_CACHE_TTL)
+
+def invalidate_accounts(*account_numbers):
+    """
+    Drops cached rows for the given accounts and the cached tables that show
+    balances. Call after the write has been committed.
+    """
+    get_account_cache().invalidate(ALL_ACCOUNTS_KEY, ROSTER_KEY, *(("account", number) for number in account_numbers))
+
+def invalidate_account_numbers():
+    """
+    Drops the cached account number list. Only opening and closing accounts
+    change it, so balance writes leave it cached.
+    """
+    get_account_cache().invalidate(ACCOUNT_NUMBERS_KEY)
+
 # Context manager for handling the connection
 class DBConnection:
+    def __init__(self, dictionary=True):
+        self.dictionary = dictionary
+
     def __enter__(self):
-        self.conn = connect_db()
-        self.cursor = self.conn.cursor(dictionary=True)
+        self.pool = get_db_pool()
+        started = time.perf_counter()
+        self.conn = self.pool.acquire()
+        query_metrics.record_acquire(time.perf_counter() - started)
+        # Every query is timed and counted, see metrics.py
+        self.cursor = InstrumentedCursor(self.conn.cursor(dictionary=self.dictionary), query_metrics)
         return self.cursor
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.conn.commit()
-        self.cursor.close()
-        self.conn.close()
+        # Connections that hit a database error are dropped instead of reused
+        discard = isinstance(exc_value, Error)
+        try:
+            self.cursor.close()
+            started = time.perf_counter()
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+            query_metrics.record_round_trip(time.perf_counter() - started)
+        except Error:
+            discard = True
+            raise
+        finally:
+            self.pool.release(self.conn, discard=discard)
 
 # Setup database and tables if they don't exist
 def setup_database():
+    """
+    Creates the database if it is missing and applies pending schema
+    migrations (see migrations.py). When the schema is current this runs no DDL.
+    """
     try:
         # Connect to MySQL without selecting a database to ensure DB exists
         with connect_db(use_database=False) as conn:
             cursor = conn.cursor()
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
-            print(f"Database '{DB_NAME}' ensured to exist.")
+            cursor.execute("SELECT COUNT(*) FROM information_schema.schemata WHERE schema_name = %s", (DB_NAME,))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(f"CREATE DATABASE {DB_NAME}")
+                print(f"Database '{DB_NAME}' created.")
+            cursor.close()
             conn.database = DB_NAME
-
-            # Create users table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(255) NOT NULL UNIQUE,
-                    password VARCHAR(255) NOT NULL
-                )
-            """)
-            
-            # Create accounts table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS accounts (
-                    account_number INT AUTO_INCREMENT PRIMARY KEY,
-                    account_holder VARCHAR(255) NOT NULL,
-                    initial_balance DECIMAL(10, 2) NOT NULL,
-                    account_type VARCHAR(50) NOT NULL
-                )
-            """)
-
-            # Create transactions table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS transactions (
-                    transaction_id INT AUTO_INCREMENT PRIMARY KEY,
-                    account_number INT,
-                    transaction_date DATETIME,
-                    transaction_type VARCHAR(50),
-                    amount DECIMAL(10, 2),
-                    balance DECIMAL(10, 2),
-                    FOREIGN KEY (account_number) REFERENCES accounts(account_number)
-                )
-            """)
-            print("Tables ensured to exist.")
+            migrate(conn, DB_NAME)
     except Error as err:
         print(f"Error setting up database: {err}")
         raise
 
 # Validate user credentials during login
 def validate_user(username, password):
+    """
+    Checks password against the user's scrypt hash (see passwords.py) on the
+    password verification pool. Hashes made with older cost settings are
+    replaced after a successful login. The user row is read on every login,
+    not cached, so a password changed from another process (passwords.py)
+    takes effect at once.
+    """
+    user = get_user(username)
+    if user is None:
+        # Spend the same time as a real check so unknown usernames don't stand out
+        check_password(password, unknown_user_hash())
+        return False
+    if not check_password(password, user["password"]):
+        return False
+    if needs_rehash(user["password"]):
+        set_password(username, password)
+    return True
+
+# Get a user row by username
+def get_user(username):
     try:
         with DBConnection() as cursor:
-            cursor.execute("SELECT * FROM users WHERE username = %s AND password = %s", (username, password))
-            user_data = cursor.fetchone()
-            if user_data:
-                return True
-            else:
-                return False
+            cursor.execute("SELECT user_id, username, password FROM users WHERE username = %s", (username,))
+            return cursor.fetchone()
+    except Error as err:
+        print(f"Error fetching user: {err}")
+        raise
+
+# Create a user or change their password
+def set_password(username, password):
+    try:
+        with DBConnection() as cursor:
+            cursor.execute("""
+                INSERT INTO users (username, password) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE password = VALUES(password)
+            """, (username, hash_password(password)))
     except Error as err:
-        print(f"Error validating user: {err}")
+        print(f"Error saving password: {err}")
         raise
 
 # Function to display the login form
@@ -115,7 +214,12 @@ def show_login_form():
     
     if st.button("Login"):
         if username and password:
-            if validate_user(username, password):
+            try:
+                valid = validate_user(username, password)
+            except TimeoutError:
+                st.error("Too many logins at once, please try again in a moment.")
+                return
+            if valid:
                 st.session_state.logged_in = True
                 st.session_state.username = username
                 st.success(f"Welcome, {username}!")
@@ -146,7 +250,9 @@ def create_account(holder_name, initial_balance=0, account_type="Checking"):
                 VALUES (%s, %s, %s)
             """, (holder_name, initial_balance, account_type))
             account_number = cursor.lastrowid
-            return account_number
+        invalidate_accounts(account_number)
+        invalidate_account_numbers()
+        return account_number
     except mysql.connector.Error as err:
         print(f"Error creating account: {err}")
         raise  # Re-raise the exception to be handled by the calling function
@@ -176,57 +282,219 @@ def get_all_accounts():
         print(f"Error fetching accounts: {err}")
         raise
 
+# Ledger insert shared by single and bulk postings
+INSERT_TRANSACTION_SQL = """
+    INSERT INTO transactions (account_number, transaction_date, transaction_type, amount, balance)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Build a columnar account roster
+def build_account_roster(chunks):
+    """
+    Builds a DataFrame from chunks of (account_number, account_holder,
+    balance_cents, account_type) tuples without creating per-account objects.
+    """
+    account_numbers = array("q")
+    balances = array("q")
+    holders = []
+    account_types = []
+    # Imported here so the login screen and other pages don't pay for pandas
+    import numpy as np
+    import pandas as pd
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        numbers, names, cents, types = zip(*chunk)
+        account_numbers.extend(numbers)
+        holders.extend(names)
+        balances.extend(cents)
+        account_types.extend(types)
+    return pd.DataFrame({
+        "account_number": np.frombuffer(account_numbers, dtype=np.int64) if account_numbers else np.empty(0, dtype=np.int64),
+        "account_holder": holders,
+        "balance_cents": np.frombuffer(balances, dtype=np.int64) if balances else np.empty(0, dtype=np.int64),
+        "account_type": pd.Categorical(account_types),
+    })
+
+def format_account_roster(roster):
+    """
+    Returns the display table for the roster. Numbers stay numeric and are
+    formatted by the browser through ROSTER_COLUMN_CONFIG.
+    """
+    import pandas as pd
+
+    return pd.DataFrame({
+        "Account Number": roster["account_number"],
+        "Account Holder": roster["account_holder"],
+        "Balance": roster["balance_cents"] / 100,
+        "Account Type": roster["account_type"],
+    })
+
+# Client-side formatting for the roster table
+ROSTER_COLUMN_CONFIG = {
+    "Account Number": st.column_config.NumberColumn("Account Number", format="%07d"),
+    "Balance": st.column_config.NumberColumn("Balance", format="$%.2f"),
+}
+
+# Get all accounts as columns
+def get_account_roster():
+    """
+    Streams the accounts table from the cursor in chunks into a columnar DataFrame.
+    Balances are returned as integer cents.
+    """
+    try:
+        with DBConnection(dictionary=False) as cursor:
+            cursor.execute("""
+                SELECT account_number, account_holder,
+                       CAST(ROUND(initial_balance * 100) AS SIGNED) AS balance_cents,
+                       account_type
+                FROM accounts
+                ORDER BY account_number
+            """)
+            return build_account_roster(iter(lambda: cursor.fetchmany(FETCH_CHUNK_SIZE), []))
+    except Error as err:
+        print(f"Error fetching account roster: {err}")
+        raise
+
+# Get the account numbers for the account pickers
+def get_account_numbers():
+    """
+    Returns every account number, zero-padded, in account order.
+    """
+    account_numbers = []
+    try:
+        with DBConnection(dictionary=False) as cursor:
+            cursor.execute("SELECT account_number FROM accounts ORDER BY account_number")
+            for chunk in iter(lambda: cursor.fetchmany(FETCH_CHUNK_SIZE), []):
+                account_numbers.extend(str(row[0]).zfill(7) for row in chunk)
+        return account_numbers
+    except Error as err:
+        print(f"Error fetching account numbers: {err}")
+        raise
+
 # Save a transaction
 def save_transaction(account_number, transaction_type, amount, balance):
     try:
         with DBConnection() as cursor:
             transaction_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute("""
-                INSERT INTO transactions (account_number, transaction_date, transaction_type, amount, balance)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (account_number, transaction_date, transaction_type, amount, balance))
+            cursor.execute(INSERT_TRANSACTION_SQL, (account_number, transaction_date, transaction_type, amount, balance))
     except Error as err:
         print(f"Error saving transaction: {err}")
         raise
 
-# Transfer Between Accounts
-def transfer_between_accounts(banking_system, source_account_number, dest_account_number, amount):
+# Round an amount to whole cents
+def to_money(amount):
     """
-    Transfer a specified amount between two accounts, updating the database and UI.
+    Converts an amount (float, str, int or Decimal) to a Decimal rounded to cents.
+    """
+    return Decimal(str(amount)).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+# Compound interest growth factor
+def growth_factor(annual_rate, periods_per_year, periods):
     """
+    Returns (1 + annual_rate% / periods_per_year) ** periods - 1, computed with
+    50 significant digits and rounded half-up to GROWTH_DECIMALS places.
+    """
+    with localcontext() as ctx:
+        ctx.prec = 50
+        rate = Decimal(str(annual_rate)) / 100
+        growth = (1 + rate / periods_per_year) ** Decimal(str(periods)) - 1
+        # Large factors (e.g. 100% monthly for decades) need more digits to keep the decimals
+        ctx.prec = max(ctx.prec, growth.adjusted() + GROWTH_DECIMALS + 1)
+        return growth.quantize(Decimal(1).scaleb(-GROWTH_DECIMALS), rounding=ROUND_HALF_UP)
+
+# Interest earned on one balance
+def calculate_interest(balance, growth):
+    """
+    Interest on balance for a growth factor from growth_factor, rounded half-up
+    to the cent. interest.py applies the same rule to many accounts at once.
+    """
+    balance = to_money(balance)
+    with localcontext() as ctx:
+        # Enough digits for the exact product, however large growth is
+        ctx.prec = max(ctx.prec, len(balance.as_tuple().digits) + len(growth.as_tuple().digits) + 2)
+        return (balance * growth).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+# Atomic transfer between two accounts
+def transfer_funds(source_account_number, dest_account_number, amount):
+    """
+    Debits the source, credits the destination and writes both ledger rows in a
+    single database transaction. Rows are locked in account-number order so
+    concurrent transfers cannot deadlock.
+    Returns the new (source_balance, dest_balance).
+    """
+    amount = to_money(amount)
+    if amount <= 0:
+        raise ValueError("Transfer amount must be greater than zero.")
+    if source_account_number == dest_account_number:
+        raise ValueError("Source and destination accounts must be different.")
+
     try:
-        # Fetch source and destination account details
-        source_account = banking_system.get_account(source_account_number)
-        dest_account = banking_system.get_account(dest_account_number)
+        with DBConnection() as cursor:
+            cursor.execute("""
+                SELECT account_number, initial_balance FROM accounts
+                WHERE account_number IN (%s, %s)
+                ORDER BY account_number
+                FOR UPDATE
+            """, (source_account_number, dest_account_number))
+            balances = {row["account_number"]: Decimal(row["initial_balance"]) for row in cursor.fetchall()}
 
-        if not source_account or not dest_account:
-            st.error("One or both accounts not found.")
-            return False
+            if source_account_number not in balances or dest_account_number not in balances:
+                raise ValueError("One or both accounts not found.")
+            if balances[source_account_number] < amount:
+                raise ValueError("Insufficient funds in the source account.")
 
-        if amount <= 0:
-            st.error("Transfer amount must be greater than zero.")
-            return False
+            source_balance = balances[source_account_number] - amount
+            dest_balance = balances[dest_account_number] + amount
 
-        # Attempt withdrawal from source and deposit to destination
-        if source_account.withdraw(amount):
-            if dest_account.deposit(amount):
-                st.success(f"Successfully transferred ${amount:.2f} from account {source_account_number} to {dest_account_number}")
-                
-                # Display updated balances for both accounts
-                st.write(f"Available Balance for Account {source_account_number}: ${source_account.get_balance():.2f}")
-                st.write(f"Available Balance for Account {dest_account_number}: ${dest_account.get_balance():.2f}")
-                return True
-            else:
-                # If deposit fails, rollback the withdrawal
-                source_account.deposit(amount)
-                st.error("Failed to deposit into the destination account. Transaction rolled back.")
-        else:
-            st.error("Insufficient funds in the source account.")
+            cursor.execute("""
+                UPDATE accounts
+                SET initial_balance = CASE account_number WHEN %s THEN %s ELSE %s END,
+                    version = version + 1
+                WHERE account_number IN (%s, %s)
+            """, (source_account_number, source_balance, dest_balance,
+                  source_account_number, dest_account_number))
+
+            transaction_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cursor.executemany(INSERT_TRANSACTION_SQL, [
+                (source_account_number, transaction_date, "Withdrawal", amount, source_balance),
+                (dest_account_number, transaction_date, "Deposit", amount, dest_balance),
+            ])
+        invalidate_accounts(source_account_number, dest_account_number)
+        return source_balance, dest_balance
+    except Error as err:
+        print(f"Error transferring funds: {err}")
+        raise
 
+# Transfer Between Accounts
+def transfer_between_accounts(banking_system, source_account_number, dest_account_number, amount):
+    """
+    Transfer a specified amount between two accounts, updating the database and UI.
+    """
+    try:
+        source_balance, dest_balance = transfer_funds(source_account_number, dest_account_number, amount)
+    except ValueError as err:
+        st.error(str(err))
+        return False
     except Exception as err:
         st.error(f"Error during transfer: {err}")
-    return False
+        return False
+
+    # Keep the account selected on the operations page in sync
+    selected = st.session_state.get("selected_account")
+    if selected is not None:
+        if selected.account_number == source_account_number:
+            selected.balance = source_balance
+        elif selected.account_number == dest_account_number:
+            selected.balance = dest_balance
 
+    st.success(f"Successfully transferred ${amount:.2f} from account {source_account_number} to {dest_account_number}")
+
+    # Display updated balances for both accounts
+    st.write(f"Available Balance for Account {source_account_number}: ${source_balance:.2f}")
+    st.write(f"Available Balance for Account {dest_account_number}: ${dest_balance:.2f}")
+    return True
 
 #update_account_balance
 def update_account_balance(account_number, new_balance):
@@ -236,13 +504,367 @@ def update_account_balance(account_number, new_balance):
     try:
         with DBConnection() as cursor:
             cursor.execute(
-                "UPDATE accounts SET initial_balance = %s WHERE account_number = %s",
+                "UPDATE accounts SET initial_balance = %s, version = version + 1 WHERE account_number = %s",
                 (new_balance, account_number),
             )
+        invalidate_accounts(account_number)
     except Error as err:
         print(f"Error updating account balance: {err}")
         raise
 
+# Raised when a balance write keeps losing to concurrent writes
+class BalanceConflictError(Exception):
+    pass
+
+# Raised when closing accounts would delete ledger rows that were not archived
+class LedgerArchiveError(Exception):
+    pass
+
+# Versioned deposit or withdrawal
+def change_balance(account_number, transaction_type, amount, balance=None, version=None):
+    """
+    Adds (Deposit) or subtracts (Withdrawal) amount and writes the ledger row
+    in one transaction. balance and version are the caller's last read of the
+    account; if omitted they are read first. The UPDATE only applies while
+    the version is unchanged, so a concurrent write is never overwritten: on
+    a conflict the account is read again and the change retried. Funds are
+    checked against balance, so like the withdraw form this refuses what the
+    caller's view of the account cannot cover.
+    Raises ValueError if the account is missing or has insufficient funds.
+    Returns the new (balance, version).
+    """
+    amount = to_money(amount)
+    delta = amount if transaction_type == "Deposit" else -amount
+
+    try:
+        for attempt in range(BALANCE_WRITE_RETRIES + 1):
+            if attempt:
+                query_metrics.record_retry()
+                time.sleep(random.uniform(0, BALANCE_RETRY_BACKOFF * 2 ** (attempt - 1)))
+            with DBConnection() as cursor:
+                if version is None:
+                    cursor.execute(
+                        "SELECT initial_balance, version FROM accounts WHERE account_number = %s",
+                        (account_number,),
+                    )
+                    row = cursor.fetchone()
+                    if row is None:
+                        raise ValueError("Account not found.")
+                    balance, version = Decimal(row["initial_balance"]), row["version"]
+                if balance + delta < 0:
+                    raise ValueError("Insufficient funds.")
+
+                cursor.execute("""
+                    UPDATE accounts
+                    SET initial_balance = initial_balance + %s, version = version + 1
+                    WHERE account_number = %s AND version = %s
+                """, (delta, account_number, version))
+                if cursor.rowcount == 1:
+                    # The version matched, so the stored balance was exactly balance
+                    balance += delta
+                    transaction_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    cursor.execute(INSERT_TRANSACTION_SQL, (account_number, transaction_date, transaction_type, amount, balance))
+                    break
+            # Someone else wrote the account since it was read
+            version = None
+        else:
+            raise BalanceConflictError(
+                f"Account {account_number} kept changing during the {transaction_type.lower()}, please try again."
+            )
+        invalidate_accounts(account_number)
+        return balance, version + 1
+    except Error as err:
+        print(f"Error changing balance: {err}")
+        raise
+
+# Bulk ledger postings
+TRANSACTION_TYPES = ("Deposit", "Withdrawal")
+
+def _post_chunk(chunk):
+    """
+    Applies one chunk of (account_number, transaction_type, amount) postings in a
+    single transaction. Returns (posted_count, rejected) where rejected holds
+    (posting, reason) pairs for postings that failed validation.
+    """
+    account_numbers = sorted({account_number for account_number, _, _ in chunk})
+    placeholders = ", ".join(["%s"] * len(account_numbers))
+    rejected = []
+    ledger_rows = []
+
+    with DBConnection() as cursor:
+        # Lock every account touched by the chunk, in a consistent order
+        cursor.execute(f"""
+            SELECT account_number, initial_balance FROM accounts
+            WHERE account_number IN ({placeholders})
+            ORDER BY account_number
+            FOR UPDATE
+        """, account_numbers)
+        balances = {row["account_number"]: Decimal(row["initial_balance"]) for row in cursor.fetchall()}
+
+        transaction_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for posting in chunk:
+            account_number, transaction_type, amount = posting
+            if account_number not in balances:
+                rejected.append((posting, "Account not found."))
+                continue
+            if transaction_type == "Withdrawal":
+                if amount > balances[account_number]:
+                    rejected.append((posting, "Insufficient funds."))
+                    continue
+                balances[account_number] -= amount
+            else:
+                # Past DECIMAL(10, 2) MySQL would fail the whole chunk's UPDATE
+                if balances[account_number] + amount > MAX_BALANCE:
+                    rejected.append((posting, "Balance limit exceeded."))
+                    continue
+                balances[account_number] += amount
+            ledger_rows.append((account_number, transaction_date, transaction_type, amount, balances[account_number]))
+
+        touched = {row[0] for row in ledger_rows}
+        if touched:
+            cursor.executemany(
+                "UPDATE accounts SET initial_balance = %s, version = version + 1 WHERE account_number = %s",
+                [(balances[account_number], account_number) for account_number in sorted(touched)],
+            )
+            cursor.executemany(INSERT_TRANSACTION_SQL, ledger_rows)
+    invalidate_accounts(*account_numbers)
+    return len(ledger_rows), rejected
+
+def post_transactions(postings, chunk_size=1000):
+    """
+    Applies many (account_number, transaction_type, amount) postings using
+    executemany, committing once per chunk of chunk_size postings.
+    Invalid postings are skipped and reported instead of failing the batch.
+    Returns a report with posted/rejected counts and per-chunk throughput.
+    """
+    report = {"posted": 0, "rejected": [], "chunks": []}
+    chunk = []
+
+    def flush():
+        started = time.perf_counter()
+        posted, rejected = _post_chunk(chunk)
+        elapsed = time.perf_counter() - started
+        report["posted"] += posted
+        report["rejected"].extend(rejected)
+        report["chunks"].append({
+            "rows": len(chunk),
+            "posted": posted,
+            "seconds": elapsed,
+            "rows_per_second": len(chunk) / elapsed if elapsed else float("inf"),
+        })
+        chunk.clear()
+
+    try:
+        for posting in postings:
+            account_number, transaction_type, amount = posting
+            if transaction_type not in TRANSACTION_TYPES:
+                report["rejected"].append((posting, f"Unknown transaction type '{transaction_type}'."))
+                continue
+            try:
+                amount = to_money(amount)
+            except ArithmeticError:
+                report["rejected"].append((posting, "Amount is not a number."))
+                continue
+            if amount <= 0:
+                report["rejected"].append((posting, "Amount must be greater than zero."))
+                continue
+            try:
+                account_number = int(account_number)
+            except (ValueError, TypeError):
+                report["rejected"].append((posting, "Account number is not a number."))
+                continue
+            chunk.append((account_number, transaction_type, amount))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    except Error as err:
+        print(f"Error posting transactions: {err}")
+        raise
+    return report
+
+
+# Ledger columns copied to transactions_archive
+ARCHIVE_COLUMNS = "transaction_id, account_number, transaction_date, transaction_type, amount, balance"
+
+def _copy_ledger(account_numbers, chunk_size):
+    """
+    Copies the ledger rows of account_numbers to transactions_archive,
+    chunk_size rows per transaction. Rows stay in transactions and accounts
+    stay open. Under REPEATABLE READ each INSERT ... SELECT takes shared
+    next-key locks on the rows it copies, so new ledger rows for these
+    accounts wait for at most one chunk to commit. Numbers already in
+    closed_accounts are left alone: their archived rows belong to the
+    account closed earlier, and _close_batch refuses to close them.
+    """
+    placeholders = ", ".join(["%s"] * len(account_numbers))
+    with DBConnection(dictionary=False) as cursor:
+        cursor.execute(
+            f"SELECT account_number FROM closed_accounts WHERE account_number IN ({placeholders})",
+            account_numbers,
+        )
+        reused = {row[0] for row in cursor.fetchall()}
+        account_numbers = [number for number in account_numbers if number not in reused]
+        if not account_numbers:
+            return
+        placeholders = ", ".join(["%s"] * len(account_numbers))
+        # Open accounts have no archived rows except copies left by an earlier
+        # attempt that did not finish; drop them so the plain INSERT below can't collide
+        cursor.execute(f"""
+            DELETE ta FROM transactions_archive ta
+            JOIN accounts a ON a.account_number = ta.account_number
+            WHERE ta.account_number IN ({placeholders})
+        """, account_numbers)
+    last_id = 0
+    while True:
+        with DBConnection(dictionary=False) as cursor:
+            # Upper transaction_id of the next chunk, then copy that id range server-side
+            cursor.execute(f"""
+                SELECT MAX(transaction_id) FROM (
+                    SELECT transaction_id FROM transactions
+                    WHERE account_number IN ({placeholders}) AND transaction_id > %s
+                    ORDER BY transaction_id
+                    LIMIT %s
+                ) AS chunk
+            """, (*account_numbers, last_id, chunk_size))
+            upper_id = cursor.fetchone()[0]
+            if upper_id is None:
+                return
+            cursor.execute(f"""
+                INSERT INTO transactions_archive ({ARCHIVE_COLUMNS})
+                SELECT {ARCHIVE_COLUMNS} FROM transactions
+                WHERE account_number IN ({placeholders}) AND transaction_id > %s AND transaction_id <= %s
+            """, (*account_numbers, last_id, upper_id))
+        last_id = upper_id
+
+def _close_batch(account_numbers, inactive_since):
+    """
+    Closes one batch of accounts in a single transaction. The accounts are
+    locked and re-checked: a non-zero balance, or with inactive_since any
+    transaction on or after it, skips the account. Ledger rows written since
+    _copy_ledger ran are archived too before the ledger is deleted, and the
+    batch is rolled back with LedgerArchiveError unless every deleted ledger
+    row has its archived copy.
+    Account numbers are assumed never to be reused: closed_accounts and
+    transactions_archive are keyed on account_number alone. MySQL 5.7 can
+    hand out a closed account's number again after a restart (the InnoDB
+    auto-increment counter is rebuilt from MAX(account_number)), so an
+    account whose number is already in closed_accounts is skipped rather
+    than mixed into the earlier account's archive.
+    Returns (closed, skipped, rows_archived) where skipped holds
+    (account_number, reason) pairs.
+    """
+    placeholders = ", ".join(["%s"] * len(account_numbers))
+    with DBConnection() as cursor:
+        cursor.execute(f"""
+            SELECT account_number, account_holder, initial_balance, account_type FROM accounts
+            WHERE account_number IN ({placeholders})
+            ORDER BY account_number
+            FOR UPDATE
+        """, account_numbers)
+        accounts = {row["account_number"]: row for row in cursor.fetchall()}
+        active = set()
+        if inactive_since is not None:
+            cursor.execute(f"""
+                SELECT DISTINCT account_number FROM transactions
+                WHERE account_number IN ({placeholders}) AND transaction_date >= %s
+            """, (*account_numbers, inactive_since))
+            active = {row["account_number"] for row in cursor.fetchall()}
+        cursor.execute(
+            f"SELECT account_number FROM closed_accounts WHERE account_number IN ({placeholders}) FOR UPDATE",
+            account_numbers,
+        )
+        reused = {row["account_number"] for row in cursor.fetchall()}
+
+        closed, skipped = [], []
+        for account_number in account_numbers:
+            account = accounts.get(account_number)
+            if account is None:
+                skipped.append((account_number, "Account not found."))
+            elif account_number in reused:
+                skipped.append((account_number, "Account number belongs to an account closed earlier."))
+            elif Decimal(account["initial_balance"]) != 0:
+                skipped.append((account_number, "Account balance is not zero."))
+            elif account_number in active:
+                skipped.append((account_number, "Account has recent transactions."))
+            else:
+                closed.append(account_number)
+
+        # Accounts that stay open must not keep the copies made by _copy_ledger.
+        # The archived rows under a reused number are the earlier account's, so keep them
+        still_open = [number for number, _ in skipped if number in accounts and number not in reused]
+        if still_open:
+            cursor.execute(
+                f"DELETE FROM transactions_archive WHERE account_number IN ({', '.join(['%s'] * len(still_open))})",
+                still_open,
+            )
+        if not closed:
+            return closed, skipped, 0
+
+        placeholders = ", ".join(["%s"] * len(closed))
+        # Ledger rows written since _copy_ledger ran
+        cursor.execute(f"""
+            INSERT INTO transactions_archive ({ARCHIVE_COLUMNS})
+            SELECT {ARCHIVE_COLUMNS} FROM transactions t
+            WHERE t.account_number IN ({placeholders})
+              AND NOT EXISTS (SELECT 1 FROM transactions_archive ta WHERE ta.transaction_id = t.transaction_id)
+        """, closed)
+        cursor.execute(f"SELECT COUNT(*) AS archived FROM transactions_archive WHERE account_number IN ({placeholders})", closed)
+        archived = cursor.fetchone()["archived"]
+        closed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.executemany(
+            "INSERT INTO closed_accounts (account_number, account_holder, account_type, closed_at) VALUES (%s, %s, %s, %s)",
+            [(number, accounts[number]["account_holder"], accounts[number]["account_type"], closed_at) for number in closed],
+        )
+        # Indexed deletes touching only these accounts' rows
+        cursor.execute(f"DELETE FROM transactions WHERE account_number IN ({placeholders})", closed)
+        rows_archived = cursor.rowcount
+        if rows_archived != archived:
+            # Raising rolls the whole batch back, ledger included
+            raise LedgerArchiveError(
+                f"Archived {archived} ledger rows but deleted {rows_archived}; accounts {closed} were not closed."
+            )
+        cursor.execute(f"DELETE FROM balance_snapshots WHERE account_number IN ({placeholders})", closed)
+        cursor.execute(f"DELETE FROM accounts WHERE account_number IN ({placeholders})", closed)
+    invalidate_accounts(*closed)
+    if closed:
+        invalidate_account_numbers()
+    return closed, skipped, rows_archived
+
+# Close accounts, archiving their ledger
+def close_accounts(account_numbers, inactive_since=None, batch_size=CLOSE_BATCH_SIZE, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Closes zero-balance accounts, moving each account to closed_accounts and
+    its ledger to transactions_archive instead of deleting them. Works in
+    batches of batch_size accounts: the ledger is first copied in chunks of
+    chunk_size rows while the accounts stay open, then each batch is closed
+    in one short transaction. With inactive_since, accounts with transactions
+    on or after that datetime are skipped.
+    Returns a report with the accounts closed and skipped, rows archived and
+    per-batch throughput.
+    """
+    report = {"closed": [], "skipped": [], "rows_archived": 0, "batches": []}
+    account_numbers = [int(number) for number in account_numbers]
+    try:
+        for i in range(0, len(account_numbers), batch_size):
+            batch = account_numbers[i:i + batch_size]
+            started = time.perf_counter()
+            _copy_ledger(batch, chunk_size)
+            closed, skipped, rows_archived = _close_batch(batch, inactive_since)
+            elapsed = time.perf_counter() - started
+            report["closed"].extend(closed)
+            report["skipped"].extend(skipped)
+            report["rows_archived"] += rows_archived
+            report["batches"].append({
+                "accounts": len(closed),
+                "rows": rows_archived,
+                "seconds": elapsed,
+                "rows_per_second": rows_archived / elapsed if elapsed else float("inf"),
+            })
+    except (Error, LedgerArchiveError) as err:
+        print(f"Error closing accounts: {err}")
+        raise
+    return report
 
 # Account Closure
 def close_account(banking_system, account_number):
@@ -251,12 +873,14 @@ def close_account(banking_system, account_number):
     if account:
         if account.get_balance() == 0:
             try:
-                with DBConnection() as cursor:
-                    cursor.execute("DELETE FROM transactions WHERE account_number = %s", (account_number,))
-                    cursor.execute("DELETE FROM accounts WHERE account_number = %s", (account_number,))
-                st.success(f"Account {account_number} has been successfully closed.")
-                return True
-            except Error as err:
+                report = close_accounts([account_number])
+                if report["closed"]:
+                    st.success(f"Account {account_number} has been successfully closed.")
+                    return True
+                # Skipped under lock: the balance changed after it was read, or the number was reused
+                st.error(report["skipped"][0][1])
+                return False
+            except (Error, LedgerArchiveError) as err:
                 st.error(f"Error closing account: {err}")
         else:
             st.error("Account balance is not zero. Please withdraw all funds before closing.")
@@ -275,22 +899,81 @@ def get_transaction_history(account_number):
         print(f"Error fetching transaction history: {err}")
         raise
 
+# Get one page of transaction history, newest first
+def get_transaction_page(account_number, page_size=50, before=None):
+    """
+    Keyset-paginated history backed by idx_transactions_account_date.
+    before is the (transaction_date, transaction_id) of the last row on the
+    previous page, or None for the newest page.
+    Returns (rows, next_before); next_before is None on the last page.
+    """
+    query = """
+        SELECT transaction_id, transaction_date, transaction_type, amount, balance
+        FROM transactions
+        WHERE account_number = %s
+    """
+    params = [account_number]
+    if before is not None:
+        query += " AND (transaction_date < %s OR (transaction_date = %s AND transaction_id < %s))"
+        params += [before[0], before[0], before[1]]
+    # Fetch one extra row to learn whether another page exists
+    query += " ORDER BY transaction_date DESC, transaction_id DESC LIMIT %s"
+    params.append(page_size + 1)
+
+    try:
+        with DBConnection() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+    except Error as err:
+        print(f"Error fetching transaction page: {err}")
+        raise
+
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        return rows, (last["transaction_date"], last["transaction_id"])
+    return rows, None
+
+# Get per-type transaction totals computed by the database
+def get_transaction_totals(account_number):
+    """
+    Returns {transaction_type: {"total": Decimal, "count": int}} for an account.
+    """
+    try:
+        with DBConnection() as cursor:
+            cursor.execute("""
+                SELECT transaction_type, SUM(amount) AS total, COUNT(*) AS count
+                FROM transactions
+                WHERE account_number = %s
+                GROUP BY transaction_type
+            """, (account_number,))
+            rows = cursor.fetchall()
+        return {row["transaction_type"]: {"total": Decimal(row["total"] or 0), "count": row["count"]} for row in rows}
+    except Error as err:
+        print(f"Error fetching transaction totals: {err}")
+        raise
+
 # Bank Account class
 class BankAccount:
-    def __init__(self, account_number, account_holder, initial_balance=0, account_type="Checking"):
+    __slots__ = ("account_number", "account_holder", "balance", "account_type", "version")
+
+    def __init__(self, account_number, account_holder, initial_balance=0, account_type="Checking", version=None):
         self.account_number = account_number
         self.account_holder = account_holder
         self.balance = Decimal(initial_balance)  # Ensure balance is a Decimal
         self.account_type = account_type
+        self.version = version  # None if unknown, see change_balance
 
     def deposit(self, amount):
         amount = Decimal(amount)
         if amount <= 0:  # Validate amount
             st.error("Deposit amount must be greater than zero.")
             return False
-        self.balance += amount
-        update_account_balance(self.account_number, self.balance)
-        save_transaction(self.account_number, "Deposit", amount, self.balance)
+        try:
+            self.balance, self.version = change_balance(self.account_number, "Deposit", amount, self.balance, self.version)
+        except (ValueError, BalanceConflictError) as err:
+            st.error(str(err))
+            return False
         
         # Update session state with the new balance
         st.session_state.selected_account.balance = self.balance
@@ -305,9 +988,11 @@ class BankAccount:
         if amount > self.balance:
             st.error("Insufficient funds.")
             return False
-        self.balance -= amount
-        update_account_balance(self.account_number, self.balance)
-        save_transaction(self.account_number, "Withdrawal", amount, self.balance)
+        try:
+            self.balance, self.version = change_balance(self.account_number, "Withdrawal", amount, self.balance, self.version)
+        except (ValueError, BalanceConflictError) as err:
+            st.error(str(err))
+            return False
         
         # Update session state with the new balance
         st.session_state.selected_account.balance = self.balance
@@ -320,12 +1005,20 @@ class BankAccount:
     def get_transaction_history(self):
         return get_transaction_history(self.account_number)
 
+    def get_transaction_page(self, page_size=50, before=None):
+        return get_transaction_page(self.account_number, page_size, before)
+
+    def get_transaction_totals(self):
+        return get_transaction_totals(self.account_number)
+
 # Banking System class
 class BankingSystem:
     def __init__(self):
         if 'accounts' not in st.session_state:
             st.session_state.accounts = {}
             st.session_state.next_account_number = 1  # Account numbers will start from 1
+        # Read-through cache shared by every session in this process
+        self.cache = get_account_cache()
 
     def create_account(self, holder_name, initial_balance=0, account_type="Checking"):
         account_number = create_account(holder_name, initial_balance, account_type)
@@ -333,31 +1026,57 @@ class BankingSystem:
         return account_number
 
     def get_account(self, account_number):
-        account_data = get_account(account_number)
+        account_data = self.cache.get_or_load(("account", account_number), lambda: get_account(account_number))
         if account_data:
             return BankAccount(
                 account_number=account_data["account_number"],
                 account_holder=account_data["account_holder"],
                 initial_balance=account_data["initial_balance"],
-                account_type=account_data["account_type"]
+                account_type=account_data["account_type"],
+                version=account_data["version"]
             )
         return None
 
     def get_all_accounts(self):
-        accounts = get_all_accounts()
+        accounts = self.cache.get_or_load(ALL_ACCOUNTS_KEY, get_all_accounts)
         return [BankAccount(
             account_number=acc["account_number"],
             account_holder=acc["account_holder"],
             initial_balance=acc["initial_balance"],
-            account_type=acc["account_type"]
+            account_type=acc["account_type"],
+            version=acc["version"]
         ) for acc in accounts]
 
+    def get_account_roster(self):
+        """
+        Returns the cached columnar roster. Treat it as read-only, it is shared.
+        """
+        return self.cache.get_or_load(ROSTER_KEY, get_account_roster)
+
+    def get_account_numbers(self):
+        """
+        Returns the cached zero-padded account numbers for the account pickers.
+        Balance writes don't invalidate them. Treat the list as read-only, it is shared.
+        """
+        return self.cache.get_or_load(ACCOUNT_NUMBERS_KEY, get_account_numbers)
+
+    def close_account(self, account_number):
+        return close_account(self, account_number)
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    def post_transactions(self, postings, chunk_size=1000):
+        """
+        Applies a batch of (account_number, transaction_type, amount) postings.
+        """
+        return post_transactions(postings, chunk_size)
+
 # Streamlit interface for the banking system
 def main():
     # Initialize banking system only if logged in
-    banking_system = BankingSystem()
-    
     if 'logged_in' not in st.session_state or not st.session_state.logged_in:
+        start_operation("Login")
         show_login_form()
         return
     st.set_page_config(page_title="Modern Banking System", layout="wide", page_icon="🏧")
@@ -369,8 +1088,10 @@ def main():
     st.sidebar.title("Banking Operations")
     operation = st.sidebar.radio(
         "Select Operation",
-        ["Create Account", "Account Operations", "View All Accounts", "Transfer Between Accounts", "Close Account", "Logout"]
+        ["Create Account", "Account Operations", "View All Accounts", "Transfer Between Accounts", "Close Account", "Query Statistics", "Logout"]
     )
+    # Count this page's queries and round trips separately
+    start_operation(operation)
     
     if operation == "Logout":
         show_logout()
@@ -407,8 +1128,7 @@ def main():
         st.title("Account Operations")
 
         # Fetch all accounts to populate sthe dropdown
-        accounts = banking_system.get_all_accounts()
-        account_numbers = [str(acc.account_number).zfill(7) for acc in accounts]
+        account_numbers = banking_system.get_account_numbers()
 
         account_number = st.selectbox("Select Account Number", account_numbers)
         account_number = int(account_number)
@@ -423,12 +1143,10 @@ def main():
         account = st.session_state.selected_account
 
         if account:
-            # Fetch transaction history for real-time updates
-            transactions = account.get_transaction_history()
-
-            # Calculate totals and net balance changes
-            total_deposits = sum(Decimal(txn["amount"]) for txn in transactions if txn["transaction_type"] == "Deposit")
-            total_withdrawals = sum(Decimal(txn["amount"]) for txn in transactions if txn["transaction_type"] == "Withdrawal")
+            # Totals are aggregated by the database instead of loading the full history
+            totals = account.get_transaction_totals()
+            total_deposits = totals.get("Deposit", {}).get("total", Decimal(0))
+            total_withdrawals = totals.get("Withdrawal", {}).get("total", Decimal(0))
             net_balance_change = total_deposits - total_withdrawals
             current_balance = Decimal(account.get_balance())
 
@@ -473,8 +1191,8 @@ def main():
             # Interest Calculation Section
             st.subheader("Interest Calculation")
             with st.form("interest_form"):
-                annual_interest_rate = Decimal(st.number_input("Annual Interest Rate (%)", min_value=0.0, max_value=100.0, value=5.0, step=0.1))
-                duration = Decimal(st.number_input("Duration (in years)", min_value=0.0, step=0.01))
+                annual_interest_rate = Decimal(str(st.number_input("Annual Interest Rate (%)", min_value=0.0, max_value=100.0, value=5.0, step=0.1)))
+                duration = Decimal(str(st.number_input("Duration (in years)", min_value=0.0, step=0.01)))
                 compound_frequency = st.selectbox("Compounding Frequency", ["Annually", "Semi-Annually", "Quarterly", "Monthly"], index=0)
 
                 if st.form_submit_button("Calculate Interest"):
@@ -487,25 +1205,51 @@ def main():
                     }
                     n = compounding_periods[compound_frequency]
 
-                    # Calculate interest using the compound interest formula
-                    P = current_balance
-                    r = annual_interest_rate / Decimal(100)
-                    t = duration
-                    A = P * (1 + r / Decimal(n)) ** (n * t)
-                    interest_earned = A - P
-
-                    st.write(f"**Interest Earned:** ${interest_earned:.2f}")
-                    st.write(f"**Balance After Interest:** ${A:.2f}")
-
-                    # Apply interest option
-                    if st.form_submit_button("Apply Interest"):
-                        account.deposit(float(interest_earned))  # Convert Decimal back to float for deposit method
+                    # Compound interest, with the rounding rules of the batch interest job
+                    growth = growth_factor(annual_interest_rate, n, n * duration)
+                    interest_earned = calculate_interest(current_balance, growth)
+                    # Kept across reruns so the Apply Interest button below can use it
+                    st.session_state.calculated_interest = (account_number, interest_earned)
+
+            # Apply interest option, outside the form so its click is not lost on the rerun
+            calculated = st.session_state.get("calculated_interest")
+            if calculated and calculated[0] == account_number:
+                interest_earned = calculated[1]
+                A = current_balance + interest_earned
+                st.write(f"**Interest Earned:** ${interest_earned:.2f}")
+                st.write(f"**Balance After Interest:** ${A:.2f}")
+
+                if A > MAX_BALANCE:
+                    st.error(f"The balance after interest would exceed ${MAX_BALANCE:,.2f}, the most an account can hold.")
+                elif interest_earned > 0 and st.button("Apply Interest"):
+                    if account.deposit(interest_earned):
+                        del st.session_state.calculated_interest
                         st.success(f"Interest of ${interest_earned:.2f} applied to the account!")
                         st.session_state.selected_account = banking_system.get_account(account_number)  # Refresh account state
 
             # Transaction History
             st.subheader("Transaction History")
+
+            # Keyset pagination: keep the cursor of every page visited so far
+            if st.session_state.get("history_account") != account_number:
+                st.session_state.history_account = account_number
+                st.session_state.history_cursors = [None]
+            cursors = st.session_state.history_cursors
+            transactions, next_cursor = account.get_transaction_page(HISTORY_PAGE_SIZE, cursors[-1])
+
+            col5, col6 = st.columns(2)
+            with col5:
+                if len(cursors) > 1 and st.button("Newer transactions"):
+                    cursors.pop()
+                    st.rerun()
+            with col6:
+                if next_cursor is not None and st.button("Older transactions"):
+                    cursors.append(next_cursor)
+                    st.rerun()
+
             if transactions:
+                import pandas as pd
+
                 df = pd.DataFrame(transactions)
                 df['transaction_date'] = pd.to_datetime(df['transaction_date']).dt.strftime('%Y-%m-%d %H:%M:%S')
                 df.rename(columns={
@@ -525,8 +1269,7 @@ def main():
         st.title("Transfer Between Accounts")
         
         # Fetch accounts
-        accounts = banking_system.get_all_accounts()
-        account_numbers = [str(acc.account_number).zfill(7) for acc in accounts]
+        account_numbers = banking_system.get_account_numbers()
         
         # Select source and destination accounts
         source_account_number = st.selectbox("Select Source Account", account_numbers)
@@ -551,8 +1294,7 @@ def main():
     elif operation == "Close Account":
         st.title("Close Account")
         
-        accounts = banking_system.get_all_accounts()
-        account_numbers = [str(acc.account_number).zfill(7) for acc in accounts]
+        account_numbers = banking_system.get_account_numbers()
         
         account_to_close = st.selectbox("Select Account to Close", account_numbers)
         account_to_close = int(account_to_close)
@@ -567,24 +1309,82 @@ def main():
     elif operation == "View All Accounts":
         st.title("All Accounts")
         
-        # Get all accounts from the banking system
-        accounts = banking_system.get_all_accounts()
+        # Get all accounts as columns, without building an object per account
+        roster = banking_system.get_account_roster()
         
-        if accounts:
+        if not roster.empty:
             # Display the accounts in a table
-            data = {
-                "Account Number": [str(account.account_number).zfill(7) for account in accounts],
-                "Account Holder": [account.account_holder for account in accounts],
-                "Balance": [f"${account.get_balance():.2f}" for account in accounts],
-                "Account Type": [account.account_type for account in accounts],
-            }
-            
-            # Convert to DataFrame for display
-            df = pd.DataFrame(data)
-            st.dataframe(df)
+            df = format_account_roster(roster)
+            st.dataframe(df, column_config=ROSTER_COLUMN_CONFIG, hide_index=True)
         else:
             st.info("No accounts available.")
 
-if __name__ == "__main__":
+    elif operation == "Query Statistics":
+        st.title("Query Statistics")
+        st.caption("Collected by this server process since it started or since the last reset.")
+
+        st.subheader("Per page")
+        st.dataframe(query_metrics.operation_table(), hide_index=True, use_container_width=True, column_config={
+            "queries_per_request": st.column_config.NumberColumn("queries / request", format="%.1f"),
+            "round_trips_per_request": st.column_config.NumberColumn("round trips / request", format="%.1f"),
+            "retries": st.column_config.NumberColumn("write retries"),
+            "db_ms_per_request": st.column_config.NumberColumn("DB ms / request", format="%.1f"),
+        })
+
+        st.subheader("Per query")
+        st.dataframe(query_metrics.query_table(), hide_index=True, use_container_width=True, column_config={
+            "total_ms": st.column_config.NumberColumn("total ms", format="%.1f"),
+            "mean_ms": st.column_config.NumberColumn("mean ms", format="%.2f"),
+            "p95_ms": st.column_config.NumberColumn("p95 ms", format="%.2f"),
+            "max_ms": st.column_config.NumberColumn("max ms", format="%.2f"),
+        })
+
+        acquire = query_metrics.acquire_summary()
+        st.write(
+            f"Connection checkouts: {acquire['count']}, waiting {acquire['mean_ms']:.2f} ms on average "
+            f"(p95 {acquire['p95_ms']:.2f} ms, max {acquire['max_ms']:.2f} ms)."
+        )
+        cache = banking_system.cache_stats()
+        st.write(f"Account cache: {cache['hits']} hits, {cache['misses']} misses, hit rate {cache['hit_rate']:.0%}.")
+
+        st.subheader(f"Slow queries (over {SLOW_QUERY_MS:.0f} ms)")
+        slow_queries = [
+            {
+                "time": datetime.fromtimestamp(logged_at).strftime('%Y-%m-%d %H:%M:%S'),
+                "page": page,
+                "ms": round(seconds * 1000, 1),
+                "query": query,
+            }
+            for logged_at, page, seconds, query in query_metrics.recent_slow_queries()
+        ]
+        if slow_queries:
+            st.dataframe(slow_queries, hide_index=True, use_container_width=True)
+        else:
+            st.info("No slow queries recorded.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                label="Download Prometheus metrics",
+                data=query_metrics.prometheus_text,
+                file_name="banking_metrics.prom",
+                mime="text/plain",
+            )
+        with col2:
+            if st.button("Reset statistics"):
+                query_metrics.reset()
+                st.rerun()
+
+# Set up the database once per server process, not on every rerun
+@st.cache_resource
+def init_database():
+    """
+    Runs setup_database the first time it is called. A failed setup raises,
+    so it is not cached and is retried on the next rerun.
+    """
     setup_database()
+    return True
+
+if __name__ == "__main__":
+    init_database()
     main()
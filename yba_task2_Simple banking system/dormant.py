@@ -0,0 +1,90 @@
+"""
+Bulk closure of dormant accounts.
+
+An account is dormant when its balance is zero and its last transaction is
+older than --days. Accounts that never had a transaction are left alone
+unless --include-unused is given, since accounts carry no opening date.
+Dormant accounts are closed with close_accounts (demo.py), which moves them
+to closed_accounts and their ledger to transactions_archive in batches:
+
+    python dormant.py --days 365 --dry-run      # list the accounts that would be closed
+    python dormant.py --days 365                # close them
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from mysql.connector import Error
+
+from demo import CLOSE_BATCH_SIZE, FETCH_CHUNK_SIZE, DBConnection, close_accounts, setup_database
+
+
+def find_dormant_accounts(inactive_since, include_unused=False):
+    """
+    Account numbers with a zero balance and no transaction on or after
+    inactive_since (a datetime), in account order.
+    """
+    query = """
+        SELECT a.account_number FROM accounts a
+        WHERE a.initial_balance = 0
+          AND NOT EXISTS (
+              SELECT 1 FROM transactions t
+              WHERE t.account_number = a.account_number AND t.transaction_date >= %s
+          )
+    """
+    if not include_unused:
+        query += " AND EXISTS (SELECT 1 FROM transactions t WHERE t.account_number = a.account_number)"
+    query += " ORDER BY a.account_number"
+
+    account_numbers = []
+    try:
+        with DBConnection(dictionary=False) as cursor:
+            cursor.execute(query, (inactive_since,))
+            for chunk in iter(lambda: cursor.fetchmany(FETCH_CHUNK_SIZE), []):
+                account_numbers.extend(row[0] for row in chunk)
+    except Error as err:
+        print(f"Error finding dormant accounts: {err}")
+        raise
+    return account_numbers
+
+
+def close_dormant_accounts(days, include_unused=False, dry_run=False, batch_size=CLOSE_BATCH_SIZE):
+    """
+    Closes every account dormant for days. Each account is checked again
+    under lock when its batch is closed, so one that was used in the
+    meantime is skipped. Returns the close_accounts report, or with dry_run
+    only the accounts that would be closed.
+    """
+    inactive_since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    account_numbers = find_dormant_accounts(inactive_since, include_unused)
+    if dry_run:
+        return {"dormant": account_numbers}
+    report = close_accounts(account_numbers, inactive_since=inactive_since, batch_size=batch_size)
+    report["dormant"] = account_numbers
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, required=True, help="days without transactions")
+    parser.add_argument("--include-unused", action="store_true", help="also close accounts that never had a transaction")
+    parser.add_argument("--batch-size", type=int, default=CLOSE_BATCH_SIZE, help="accounts closed per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="list the dormant accounts without closing them")
+    args = parser.parse_args()
+
+    setup_database()
+    report = close_dormant_accounts(args.days, args.include_unused, args.dry_run, args.batch_size)
+    print(f"{len(report['dormant'])} accounts have been dormant for {args.days} days.")
+    if args.dry_run:
+        for account_number in report["dormant"]:
+            print(f"  {str(account_number).zfill(7)}")
+        return
+
+    seconds = sum(batch["seconds"] for batch in report["batches"])
+    print(f"Closed {len(report['closed'])} accounts and archived {report['rows_archived']} ledger rows "
+          f"in {len(report['batches'])} batches ({seconds:.2f}s).")
+    for account_number, reason in report["skipped"]:
+        print(f"  skipped {str(account_number).zfill(7)}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Batch interest posting for the banking database.
+
+Interest for every eligible account is computed in one NumPy pass over
+integer cents and credited through post_transactions, i.e. bulk ledger
+inserts with one transaction per chunk. The rounding rules are the ones
+the single-account "Interest Calculation" form uses:
+
+1. growth = (1 + rate / periods_per_year) ** periods - 1, computed with
+   50-digit Decimals and rounded half-up to GROWTH_DECIMALS places
+   (growth_factor in demo.py);
+2. interest = balance * growth, rounded half-up to the cent.
+
+Balances are read once, up front, so interest accrues on the balance at
+that cut-off even if deposits arrive while it is being posted. Each run
+credits interest again, so run it once per period:
+
+    python interest.py --rate 2.5                  # one month's interest on Savings accounts
+    python interest.py --rate 2.5 --dry-run        # show what would be credited
+    python interest.py --rate 4 --periods-per-year 4 --account-type Checking
+"""
+import argparse
+import time
+from array import array
+from decimal import Decimal
+from itertools import repeat
+
+import numpy as np
+from mysql.connector import Error
+
+from demo import (
+    FETCH_CHUNK_SIZE,
+    GROWTH_DECIMALS,
+    DBConnection,
+    growth_factor,
+    post_transactions,
+    setup_database,
+)
+
+GROWTH_SCALE = 10 ** GROWTH_DECIMALS
+
+# Balances are below 10**10 cents (DECIMAL(10, 2)); splitting them into two
+# 5-digit halves keeps every product below inside an int64
+_SPLIT = 10 ** 5
+
+
+def interest_cents(balance_cents, growth):
+    """
+    calculate_interest (demo.py) for an int64 array of balances in cents.
+    Exact: the products are split into int64 parts instead of using floats.
+    """
+    scaled = int(growth.scaleb(GROWTH_DECIMALS))
+    if not 0 <= scaled < np.iinfo(np.int64).max // _SPLIT:
+        raise ValueError(f"Growth factor {growth} is outside what the batch engine supports.")
+    high, low = np.divmod(np.asarray(balance_cents, dtype=np.int64), _SPLIT)
+    # balance * scaled = high * scaled * _SPLIT + low * scaled; divide each
+    # part by GROWTH_SCALE separately and round the sum of the remainders
+    high_units, high_rest = np.divmod(high * scaled, GROWTH_SCALE // _SPLIT)
+    low_units, low_rest = np.divmod(low * scaled, GROWTH_SCALE)
+    return high_units + low_units + (high_rest * _SPLIT + low_rest + GROWTH_SCALE // 2) // GROWTH_SCALE
+
+
+def eligible_balances(account_type):
+    """
+    Streams the accounts of account_type with a positive balance.
+    Returns (account_numbers, balance_cents) as int64 arrays.
+    """
+    account_numbers = array("q")
+    balance_cents = array("q")
+    try:
+        with DBConnection(dictionary=False) as cursor:
+            cursor.execute("""
+                SELECT account_number, CAST(ROUND(initial_balance * 100) AS SIGNED)
+                FROM accounts
+                WHERE account_type = %s AND initial_balance > 0
+                ORDER BY account_number
+            """, (account_type,))
+            for chunk in iter(lambda: cursor.fetchmany(FETCH_CHUNK_SIZE), []):
+                numbers, cents = zip(*chunk)
+                account_numbers.extend(numbers)
+                balance_cents.extend(cents)
+    except Error as err:
+        print(f"Error fetching balances for interest: {err}")
+        raise
+    return np.frombuffer(account_numbers, dtype=np.int64), np.frombuffer(balance_cents, dtype=np.int64)
+
+
+def post_interest(annual_rate, periods_per_year=12, periods=1, account_type="Savings", dry_run=False, chunk_size=1000):
+    """
+    Credits interest for periods compounding periods to every account of
+    account_type with a positive balance. Returns a report with the growth
+    factor, eligible and credited accounts, the total, the per-account
+    interest (account_numbers and interest_cents arrays) and, unless dry_run,
+    the post_transactions report.
+    """
+    if Decimal(str(annual_rate)) < 0:
+        raise ValueError("Interest rate cannot be negative.")
+
+    started = time.perf_counter()
+    growth = growth_factor(annual_rate, periods_per_year, periods)
+    account_numbers, balance_cents = eligible_balances(account_type)
+    interest = interest_cents(balance_cents, growth)
+    credited = interest > 0
+    report = {
+        "growth": growth,
+        "eligible": len(account_numbers),
+        "credited": int(credited.sum()),
+        "total_interest": Decimal(int(interest.sum())).scaleb(-2),
+        "account_numbers": account_numbers[credited],
+        "interest_cents": interest[credited],
+        "posting": None,
+        "computed_seconds": time.perf_counter() - started,
+    }
+
+    if not dry_run:
+        amounts = (Decimal(cents).scaleb(-2) for cents in report["interest_cents"].tolist())
+        postings = zip(report["account_numbers"].tolist(), repeat("Deposit"), amounts)
+        report["posting"] = post_transactions(postings, chunk_size)
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", required=True, help="annual interest rate in percent")
+    parser.add_argument("--periods-per-year", type=int, default=12, help="compounding periods per year")
+    parser.add_argument("--periods", default="1", help="compounding periods to credit")
+    parser.add_argument("--account-type", default="Savings")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="compute the interest without posting it")
+    args = parser.parse_args()
+
+    setup_database()
+    report = post_interest(
+        args.rate, args.periods_per_year, args.periods, args.account_type,
+        dry_run=args.dry_run, chunk_size=args.chunk_size,
+    )
+    print(f"Growth factor {report['growth']}: {report['credited']} of {report['eligible']} "
+          f"{args.account_type} accounts earn ${report['total_interest']:.2f} in total "
+          f"(computed in {report['computed_seconds']:.2f}s).")
+    if args.dry_run:
+        for number, cents in zip(report["account_numbers"][:10].tolist(), report["interest_cents"][:10].tolist()):
+            print(f"  {str(number).zfill(7)}  ${Decimal(cents).scaleb(-2)}")
+        if report["credited"] > 10:
+            print(f"  ... and {report['credited'] - 10} more")
+        print("Dry run: nothing was posted.")
+        return
+
+    posting = report["posting"]
+    print(f"Posted {posting['posted']} interest deposits in {len(posting['chunks'])} chunks "
+          f"({report['seconds']:.2f}s in total).")
+    for posting_row, reason in posting["rejected"]:
+        print(f"  rejected {posting_row[0]}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Query instrumentation for the banking data layer.
+
+DBConnection wraps every cursor in an InstrumentedCursor, which records per
+query fingerprint the execute time, rows returned and errors, plus the time
+spent waiting for a pooled connection. Queries slower than SLOW_QUERY_MS are
+written to the slow-query log. Each query and round trip is also counted
+against the current operation (the Streamlit page being rendered), set with
+start_operation().
+
+Everything is process-wide and exported by prometheus_text().
+"""
+import bisect
+import contextvars
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+
+# Queries slower than this are logged
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Optional file for the slow-query log; without it slow queries go to stderr
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG")
+# Slow queries kept in memory for the admin page
+SLOW_QUERY_HISTORY = 100
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+slow_query_logger = logging.getLogger("banking.slow_queries")
+if SLOW_QUERY_LOG:
+    _handler = logging.FileHandler(SLOW_QUERY_LOG)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_query_logger.addHandler(_handler)
+
+_current_operation = contextvars.ContextVar("banking_operation", default="other")
+
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b")
+_VALUE_LISTS = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+
+
+def fingerprint(query):
+    """
+    Normalizes a query so executions differing only in literal values share
+    statistics: whitespace is collapsed, literals become ? and value lists
+    become (...).
+    """
+    query = " ".join(query.split())
+    query = _LITERALS.sub("?", query)
+    return _VALUE_LISTS.sub("(...)", query)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (seconds), in the Prometheus style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimates the q-quantile by interpolating inside its bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs ending with +Inf."""
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            yield bound, total
+
+
+class QueryStats:
+    __slots__ = ("latency", "rows", "errors")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.rows = 0
+        self.errors = 0
+
+
+class OperationStats:
+    __slots__ = ("requests", "queries", "round_trips", "db_seconds", "retries")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.round_trips = 0
+        self.db_seconds = 0.0
+        self.retries = 0
+
+
+class QueryMetrics:
+    """Process-wide query statistics. All methods are thread-safe."""
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.queries = {}  # fingerprint -> QueryStats
+        self.operations = {}  # operation -> OperationStats
+        self.acquire = Histogram()
+        self.slow_queries = deque(maxlen=SLOW_QUERY_HISTORY)
+        self._lock = threading.Lock()
+
+    def _operation(self, name):
+        stats = self.operations.get(name)
+        if stats is None:
+            stats = self.operations[name] = OperationStats()
+        return stats
+
+    def record_request(self, operation):
+        with self._lock:
+            self._operation(operation).requests += 1
+
+    def record_acquire(self, seconds):
+        with self._lock:
+            self.acquire.observe(seconds)
+
+    def record_query(self, query, seconds, error=False, statements=1, round_trips=1):
+        key = fingerprint(query)
+        operation = _current_operation.get()
+        with self._lock:
+            stats = self.queries.get(key)
+            if stats is None:
+                stats = self.queries[key] = QueryStats()
+            stats.latency.observe(seconds)
+            stats.errors += error
+            current = self._operation(operation)
+            current.queries += statements
+            current.round_trips += round_trips
+            current.db_seconds += seconds
+        if seconds >= self.slow_query_seconds:
+            entry = (time.time(), operation, seconds, " ".join(query.split()))
+            with self._lock:
+                self.slow_queries.append(entry)
+            slow_query_logger.warning("slow query: %.1f ms [%s] %s", seconds * 1000, operation, entry[3])
+        return key
+
+    def record_rows(self, key, rows):
+        with self._lock:
+            stats = self.queries.get(key)
+            if stats is not None:  # None if reset() ran since the execute
+                stats.rows += rows
+
+    def record_round_trip(self, seconds):
+        """A commit or rollback: a round trip that is not a query."""
+        operation = _current_operation.get()
+        with self._lock:
+            current = self._operation(operation)
+            current.round_trips += 1
+            current.db_seconds += seconds
+
+    def record_retry(self):
+        """A write retried because another writer changed the row first."""
+        operation = _current_operation.get()
+        with self._lock:
+            self._operation(operation).retries += 1
+
+    def reset(self):
+        with self._lock:
+            self.queries.clear()
+            self.operations.clear()
+            self.acquire = Histogram()
+            self.slow_queries.clear()
+
+    def recent_slow_queries(self):
+        """(logged_at, operation, seconds, query) tuples, newest first."""
+        with self._lock:
+            return list(reversed(self.slow_queries))
+
+    def query_table(self):
+        """One dict per fingerprint, slowest total time first."""
+        with self._lock:
+            rows = [
+                {
+                    "query": key,
+                    "calls": stats.latency.count,
+                    "total_ms": stats.latency.sum * 1000,
+                    "mean_ms": stats.latency.sum / stats.latency.count * 1000 if stats.latency.count else 0.0,
+                    "p95_ms": stats.latency.quantile(0.95) * 1000,
+                    "max_ms": stats.latency.max * 1000,
+                    "rows": stats.rows,
+                    "errors": stats.errors,
+                }
+                for key, stats in self.queries.items()
+            ]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def operation_table(self):
+        """One dict per operation with per-request averages."""
+        with self._lock:
+            return [
+                {
+                    "operation": name,
+                    "requests": stats.requests,
+                    "queries": stats.queries,
+                    "round_trips": stats.round_trips,
+                    "retries": stats.retries,
+                    "queries_per_request": stats.queries / stats.requests if stats.requests else 0.0,
+                    "round_trips_per_request": stats.round_trips / stats.requests if stats.requests else 0.0,
+                    "db_ms_per_request": stats.db_seconds / stats.requests * 1000 if stats.requests else 0.0,
+                }
+                for name, stats in sorted(self.operations.items())
+            ]
+
+    def acquire_summary(self):
+        with self._lock:
+            histogram = self.acquire
+            return {
+                "count": histogram.count,
+                "mean_ms": histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                "p95_ms": histogram.quantile(0.95) * 1000,
+                "max_ms": histogram.max * 1000,
+            }
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name, labels, values):
+            for bound, total in values.cumulative():
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels, le=le)} {total}")
+            lines.append(f"{name}_sum{_labels(labels)} {values.sum!r}")
+            lines.append(f"{name}_count{_labels(labels)} {values.count}")
+
+        with self._lock:
+            lines.append("# HELP banking_db_query_seconds Query execute time by query fingerprint.")
+            lines.append("# TYPE banking_db_query_seconds histogram")
+            for key, stats in self.queries.items():
+                histogram("banking_db_query_seconds", {"query": key}, stats.latency)
+            lines.append("# HELP banking_db_query_rows_total Rows returned by query fingerprint.")
+            lines.append("# TYPE banking_db_query_rows_total counter")
+            for key, stats in self.queries.items():
+                lines.append(f"banking_db_query_rows_total{_labels({'query': key})} {stats.rows}")
+            lines.append("# HELP banking_db_query_errors_total Failed executions by query fingerprint.")
+            lines.append("# TYPE banking_db_query_errors_total counter")
+            for key, stats in self.queries.items():
+                lines.append(f"banking_db_query_errors_total{_labels({'query': key})} {stats.errors}")
+            lines.append("# HELP banking_db_connection_acquire_seconds Time waiting for a pooled connection.")
+            lines.append("# TYPE banking_db_connection_acquire_seconds histogram")
+            histogram("banking_db_connection_acquire_seconds", {}, self.acquire)
+            for metric, field, help_text in (
+                ("banking_operation_requests_total", "requests", "Page renders by operation."),
+                ("banking_operation_queries_total", "queries", "SQL statements executed by operation."),
+                ("banking_operation_round_trips_total", "round_trips", "Database round trips by operation."),
+                ("banking_operation_db_seconds_total", "db_seconds", "Time spent in the database by operation."),
+                ("banking_operation_retries_total", "retries", "Writes retried after a version conflict by operation."),
+            ):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for name, stats in self.operations.items():
+                    lines.append(f"{metric}{_labels({'operation': name})} {getattr(stats, field)!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    """Escapes a label value: backslash, double quote and newline."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class InstrumentedCursor:
+    """
+    Wraps a DB-API cursor, timing execute/executemany and counting the rows
+    fetched afterwards. Everything else is passed through.
+    """
+
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+        self._key = None
+
+    def _timed(self, method, query, args, statements, round_trips):
+        started = time.perf_counter()
+        try:
+            result = method(query, args)
+        except Exception:
+            self._metrics.record_query(
+                query, time.perf_counter() - started, error=True, statements=statements, round_trips=round_trips
+            )
+            raise
+        self._key = self._metrics.record_query(
+            query, time.perf_counter() - started, statements=statements, round_trips=round_trips
+        )
+        return result
+
+    def execute(self, query, params=None):
+        return self._timed(self._cursor.execute, query, params, 1, 1)
+
+    def executemany(self, query, seq_params):
+        seq_params = list(seq_params)
+        # mysql.connector sends an INSERT batch as one multi-row statement,
+        # anything else as one statement per parameter set
+        is_insert = query.lstrip().upper().startswith("INSERT")
+        round_trips = 1 if is_insert else len(seq_params)
+        return self._timed(self._cursor.executemany, query, seq_params, len(seq_params), round_trips)
+
+    def _count(self, rows):
+        if self._key is not None and rows:
+            self._metrics.record_rows(self._key, rows)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._count(row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def start_operation(name):
+    """Attributes the queries that follow on this thread to name, and counts one request for it."""
+    _current_operation.set(name)
+    query_metrics.record_request(name)
+
+
+# Shared by every session in this process
+query_metrics = QueryMetrics()
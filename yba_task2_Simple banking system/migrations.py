@@ -0,0 +1,259 @@
+"""
+Versioned schema migrations for the banking database.
+
+Every migration runs once per database. The versions applied are recorded
+in the schema_migrations table, so when the schema is current migrate()
+only reads the version and runs no DDL.
+
+    python migrations.py            # apply pending migrations, e.g. on deploy
+    python migrations.py status     # show the applied and pending versions
+"""
+import time
+from collections import namedtuple
+
+from passwords import hash_password, is_hashed
+
+# apply(cursor, schema) makes the change; it must be safe to re-run on a
+# database that already has it, since versions were not tracked before
+Migration = namedtuple("Migration", "version description apply")
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Named lock held while migrating, so two processes starting together don't
+# apply the same migration twice
+LOCK_NAME = "banking_schema_migration"
+LOCK_TIMEOUT = 60  # seconds
+
+
+def _table_exists(cursor, schema, table):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = %s AND table_name = %s",
+        (schema, table),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def _index_exists(cursor, schema, table, index):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = %s AND table_name = %s AND index_name = %s
+    """, (schema, table, index))
+    return cursor.fetchone()[0] > 0
+
+
+def _constraint_exists(cursor, schema, table, constraint):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.table_constraints
+        WHERE table_schema = %s AND table_name = %s AND constraint_name = %s
+    """, (schema, table, constraint))
+    return cursor.fetchone()[0] > 0
+
+
+def _column_exists(cursor, schema, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s AND column_name = %s
+    """, (schema, table, column))
+    return cursor.fetchone()[0] > 0
+
+
+def _create_tables(cursor, schema):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) NOT NULL UNIQUE,
+            password VARCHAR(255) NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS accounts (
+            account_number INT AUTO_INCREMENT PRIMARY KEY,
+            account_holder VARCHAR(255) NOT NULL,
+            initial_balance DECIMAL(10, 2) NOT NULL,
+            account_type VARCHAR(50) NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            transaction_id INT AUTO_INCREMENT PRIMARY KEY,
+            account_number INT,
+            transaction_date DATETIME,
+            transaction_type VARCHAR(50),
+            amount DECIMAL(10, 2),
+            balance DECIMAL(10, 2),
+            FOREIGN KEY (account_number) REFERENCES accounts(account_number)
+        )
+    """)
+
+
+def _add_history_index(cursor, schema):
+    # Serves the paginated transaction history and the per-type totals
+    if not _index_exists(cursor, schema, "transactions", "idx_transactions_account_date"):
+        cursor.execute("""
+            CREATE INDEX idx_transactions_account_date
+            ON transactions (account_number, transaction_date, transaction_id)
+        """)
+
+
+def _add_balance_check(cursor, schema):
+    # Withdrawals and transfers already refuse to overdraw; this makes the
+    # database refuse it too (enforced from MySQL 8.0.16)
+    if not _constraint_exists(cursor, schema, "accounts", "chk_accounts_balance_not_negative"):
+        cursor.execute("""
+            ALTER TABLE accounts
+            ADD CONSTRAINT chk_accounts_balance_not_negative CHECK (initial_balance >= 0)
+        """)
+
+
+def _add_account_version(cursor, schema):
+    # Bumped by every balance write; deposits and withdrawals only apply if it
+    # is unchanged since the balance was read (see change_balance in demo.py)
+    if not _column_exists(cursor, schema, "accounts", "version"):
+        cursor.execute("ALTER TABLE accounts ADD COLUMN version INT NOT NULL DEFAULT 0")
+
+
+
+def _create_balance_snapshots(cursor, schema):
+    # Last reconciled balance of each account, see reconcile.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS balance_snapshots (
+            account_number INT PRIMARY KEY,
+            as_of_transaction_id INT NOT NULL,
+            balance DECIMAL(10, 2) NOT NULL,
+            taken_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+
+def _create_archive_tables(cursor, schema):
+    # Closed accounts and their ledger, moved here instead of being deleted
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS closed_accounts (
+            account_number INT PRIMARY KEY,
+            account_holder VARCHAR(255) NOT NULL,
+            account_type VARCHAR(50) NOT NULL,
+            closed_at DATETIME NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transactions_archive (
+            transaction_id INT PRIMARY KEY,
+            account_number INT NOT NULL,
+            transaction_date DATETIME,
+            transaction_type VARCHAR(50),
+            amount DECIMAL(10, 2),
+            balance DECIMAL(10, 2),
+            INDEX idx_transactions_archive_account (account_number, transaction_id)
+        )
+    """)
+
+
+
+def _add_ledger_id_index(cursor, schema):
+    # Each account's ledger in transaction_id order, so reconcile.py can skip
+    # the rows before an account's snapshot. The foreign key's own index on
+    # account_number was dropped by MySQL once idx_transactions_account_date
+    # could serve the key
+    if not _index_exists(cursor, schema, "transactions", "idx_transactions_account_id"):
+        cursor.execute("""
+            CREATE INDEX idx_transactions_account_id
+            ON transactions (account_number, transaction_id)
+        """)
+
+
+def _hash_plaintext_passwords(cursor, schema):
+    # Logins only accept hashes from now on; rows already hashed are left alone
+    cursor.execute("SELECT user_id, password FROM users")
+    plaintext = [(user_id, password) for user_id, password in cursor.fetchall() if not is_hashed(password)]
+    for user_id, password in plaintext:
+        cursor.execute("UPDATE users SET password = %s WHERE user_id = %s", (hash_password(password), user_id))
+
+
+MIGRATIONS = [
+    Migration(1, "create users, accounts and transactions tables", _create_tables),
+    Migration(2, "index transactions by account and date", _add_history_index),
+    Migration(3, "forbid negative account balances", _add_balance_check),
+    Migration(4, "add a version to accounts for optimistic balance writes", _add_account_version),
+    Migration(5, "create balance_snapshots table for reconciliation", _create_balance_snapshots),
+    Migration(6, "create closed_accounts and transactions_archive tables", _create_archive_tables),
+    Migration(7, "hash plaintext passwords with scrypt", _hash_plaintext_passwords),
+    Migration(8, "index transactions by account and transaction id", _add_ledger_id_index),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(cursor, schema):
+    """Highest migration version applied, 0 for a database that predates versioning."""
+    if not _table_exists(cursor, schema, "schema_migrations"):
+        return 0
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return cursor.fetchone()[0]
+
+
+def migrate(conn, schema):
+    """
+    Applies pending migrations in order, committing after each one.
+    Returns a list of (version, description, seconds) for the migrations
+    applied; empty when the schema was already current.
+    """
+    cursor = conn.cursor()
+    try:
+        if schema_version(cursor, schema) >= LATEST_VERSION:
+            return []
+
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise TimeoutError(f"Another process has been migrating the schema for over {LOCK_TIMEOUT}s.")
+        try:
+            cursor.execute(SCHEMA_MIGRATIONS_DDL)
+            # Re-read under the lock: another process may have migrated meanwhile
+            current = schema_version(cursor, schema)
+            applied = []
+            for migration in MIGRATIONS:
+                if migration.version <= current:
+                    continue
+                started = time.perf_counter()
+                migration.apply(cursor, schema)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (migration.version, migration.description),
+                )
+                conn.commit()
+                seconds = time.perf_counter() - started
+                applied.append((migration.version, migration.description, seconds))
+                print(f"Applied migration {migration.version}: {migration.description} ({seconds:.3f}s)")
+            return applied
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def main():
+    import sys
+
+    import demo
+
+    if sys.argv[1:] == ["status"]:
+        with demo.connect_db() as conn:
+            cursor = conn.cursor()
+            current = schema_version(cursor, demo.DB_NAME)
+            cursor.close()
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version <= current else "pending"
+            print(f"{migration.version:>4}  {state:<8} {migration.description}")
+    else:
+        demo.setup_database()
+        print(f"Schema is at version {LATEST_VERSION}.")
+
+
+if __name__ == "__main__":
+    main()
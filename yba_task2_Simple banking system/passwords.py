@@ -0,0 +1,129 @@
+"""
+Password hashing for the banking login.
+
+Passwords are stored as scrypt hashes (hashlib, no extra dependency) in the
+form scrypt$n$r$p$salt$hash. scrypt is deliberately slow and memory hungry
+(128 * n * r bytes, 16 MiB by default), so logins are verified on a small
+shared thread pool: a burst of logins queues there instead of running
+every KDF at once.
+
+    python passwords.py set USERNAME     # create a user or change their password
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+# scrypt cost; raising n later re-hashes each password at its next login
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# Password checks that may run at once, and how long a login waits for a turn
+VERIFY_WORKERS = int(os.getenv("PASSWORD_VERIFY_WORKERS", "2"))
+VERIFY_TIMEOUT = float(os.getenv("PASSWORD_VERIFY_TIMEOUT", "10"))  # seconds
+
+# Process-wide, kept in an imported module so it survives Streamlit reruns
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p, maxmem=2 * 128 * n * r * p, dklen=HASH_BYTES,
+    )
+
+
+def hash_password(password, n=SCRYPT_N):
+    """Hashes password with a new random salt."""
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(password, salt, n, SCRYPT_R, SCRYPT_P)
+    return "$".join([
+        "scrypt", str(n), str(SCRYPT_R), str(SCRYPT_P),
+        base64.b64encode(salt).decode(), base64.b64encode(digest).decode(),
+    ])
+
+
+def is_hashed(stored):
+    return stored.startswith("scrypt$")
+
+
+def verify_password(password, stored):
+    """True if password matches a hash from hash_password. Anything else, including plaintext, fails."""
+    try:
+        scheme, n, r, p, salt, digest = stored.split("$")
+        if scheme != "scrypt":
+            return False
+        expected = base64.b64decode(digest)
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+def needs_rehash(stored):
+    """True if stored was hashed with other cost settings than the current ones."""
+    return stored.split("$")[1:4] != [str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+
+
+def _verify_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix="password-verify")
+        return _pool
+
+
+def check_password(password, stored):
+    """
+    verify_password on the shared verification pool. Raises TimeoutError if
+    the pool is too busy to get to it within VERIFY_TIMEOUT seconds; the
+    check is then dropped from the queue so abandoned logins don't pile up.
+    """
+    future = _verify_pool().submit(verify_password, password, stored)
+    try:
+        return future.result(timeout=VERIFY_TIMEOUT)
+    except futures.TimeoutError:
+        # Only a check still waiting in the queue can be cancelled; a running one finishes
+        future.cancel()
+        # Before Python 3.11 futures.TimeoutError is not the builtin TimeoutError
+        raise TimeoutError(f"Password check did not start within {VERIFY_TIMEOUT}s.") from None
+
+
+# Checked against when the username does not exist, so a failed login takes
+# as long either way
+_unknown_user_hash = None
+
+
+def unknown_user_hash():
+    global _unknown_user_hash
+    if _unknown_user_hash is None:
+        _unknown_user_hash = hash_password(secrets.token_urlsafe(16))
+    return _unknown_user_hash
+
+
+def main():
+    import getpass
+    import sys
+
+    import demo
+
+    if len(sys.argv) != 3 or sys.argv[1] != "set":
+        raise SystemExit("usage: python passwords.py set USERNAME")
+    username = sys.argv[2]
+    password = getpass.getpass(f"New password for {username}: ")
+    if not password or password != getpass.getpass("Repeat it: "):
+        raise SystemExit("Passwords are empty or do not match.")
+    demo.setup_database()
+    demo.set_password(username, password)
+    print(f"Password for {username} saved.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Ledger reconciliation for the banking database.
+
+Every account's balance is re-derived from its ledger and compared with
+accounts.initial_balance and with the running balance stored on each
+transaction row. Derivation starts from the account's snapshot in
+balance_snapshots, so a run only reads the ledger rows written since the
+previous one; accounts that reconcile get a new snapshot as of their latest
+transaction. Cheap enough to run hourly, e.g. from cron:
+
+    python reconcile.py             # reconcile and advance the snapshots
+    python reconcile.py --check     # reconcile without writing snapshots
+    python reconcile.py --full      # ignore the snapshots, re-derive from the first row
+
+Exits with status 1 if any account is flagged.
+"""
+import argparse
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from mysql.connector import Error
+
+from demo import FETCH_CHUNK_SIZE, DBConnection, setup_database
+
+# Snapshot rows written per executemany
+SNAPSHOT_WRITE_CHUNK = 1000
+
+# An account whose ledger does not add up. transaction_id is the first row
+# whose running balance is wrong, or the last row read for a stored balance
+Mismatch = namedtuple("Mismatch", "account_number transaction_id reason expected actual")
+
+# Amounts are compared as integer cents, which is much faster than Decimal
+ACCOUNTS_SQL = """
+    SELECT a.account_number, CAST(ROUND(a.initial_balance * 100) AS SIGNED),
+           s.as_of_transaction_id, CAST(ROUND(s.balance * 100) AS SIGNED)
+    FROM accounts a
+    LEFT JOIN balance_snapshots s ON s.account_number = a.account_number
+"""
+
+# Driven from accounts: each account's rows are looked up on
+# idx_transactions_account_id (account_number, transaction_id, migration 8),
+# where they are in transaction_id order, so rows before the snapshot are
+# skipped in the index without reading them from the table.
+# benchmark.py reconcile checks the plan with EXPLAIN
+LEDGER_SQL = """
+    SELECT t.account_number, t.transaction_id,
+           CAST(ROUND(t.amount * 100) AS SIGNED) * IF(t.transaction_type = 'Deposit', 1, -1),
+           CAST(ROUND(t.balance * 100) AS SIGNED)
+    FROM accounts a
+    LEFT JOIN balance_snapshots s ON s.account_number = a.account_number
+    JOIN transactions t ON t.account_number = a.account_number AND t.transaction_id > {since}
+    ORDER BY t.account_number, t.transaction_id
+"""
+
+SNAPSHOT_SQL = """
+    INSERT INTO balance_snapshots (account_number, as_of_transaction_id, balance)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        as_of_transaction_id = VALUES(as_of_transaction_id),
+        balance = VALUES(balance),
+        taken_at = CURRENT_TIMESTAMP
+"""
+
+
+def ledger_sql(full=False):
+    return LEDGER_SQL.format(since="0" if full else "COALESCE(s.as_of_transaction_id, 0)")
+
+
+def explain_ledger_query(full=False):
+    """EXPLAIN rows of the ledger query, as dicts, to check which indexes it uses."""
+    try:
+        with DBConnection() as cursor:
+            cursor.execute("EXPLAIN " + ledger_sql(full))
+            return cursor.fetchall()
+    except Error as err:
+        print(f"Error explaining the ledger query: {err}")
+        raise
+
+
+def _money(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def _stream(cursor):
+    """Yields the rows of the last query, fetched FETCH_CHUNK_SIZE at a time."""
+    for chunk in iter(lambda: cursor.fetchmany(FETCH_CHUNK_SIZE), []):
+        yield from chunk
+
+
+def reconcile(full=False, write_snapshots=True):
+    """
+    Re-derives every balance from its snapshot (or, with full, from the first
+    ledger row) plus the ledger rows after it. An account without a snapshot
+    starts from the balance before its first row.
+    Returns a report with the accounts and ledger rows checked, the mismatches
+    found and the number of snapshots written.
+    """
+    started = time.perf_counter()
+    mismatches = []
+    try:
+        # One transaction, so balances and ledger come from the same consistent read
+        with DBConnection(dictionary=False) as cursor:
+            cursor.execute(ACCOUNTS_SQL)
+            accounts = {
+                number: (stored, None, None) if full else (stored, as_of, snapshot)
+                for number, stored, as_of, snapshot in _stream(cursor)
+            }
+
+            cursor.execute(ledger_sql(full))
+            progress = {}  # account_number -> [derived_cents, last_transaction_id, flagged]
+            ledger_rows = 0
+            for number, transaction_id, delta, running in _stream(cursor):
+                ledger_rows += 1
+                entry = progress.get(number)
+                if entry is None:
+                    snapshot = accounts[number][2]
+                    entry = progress[number] = [running - delta if snapshot is None else snapshot, None, False]
+                entry[0] += delta
+                entry[1] = transaction_id
+                if entry[0] != running and not entry[2]:
+                    entry[2] = True
+                    mismatches.append(Mismatch(
+                        number, transaction_id, "running balance on ledger row", _money(entry[0]), _money(running)
+                    ))
+
+        snapshots = []
+        for number, (stored, as_of, snapshot) in accounts.items():
+            entry = progress.get(number)
+            if entry is not None:
+                derived, last_id, flagged = entry
+            elif snapshot is not None:
+                derived, last_id, flagged = snapshot, as_of, False
+            else:  # no ledger rows yet: the stored balance is the opening balance
+                derived, last_id, flagged = stored, 0, False
+            if derived != stored:
+                flagged = True
+                mismatches.append(Mismatch(number, last_id, "stored balance", _money(derived), _money(stored)))
+            # Flagged accounts keep their old snapshot, so they are checked again next run
+            if not flagged and (entry is not None or snapshot is None):
+                snapshots.append((number, last_id, _money(derived)))
+
+        if write_snapshots:
+            with DBConnection() as cursor:
+                for i in range(0, len(snapshots), SNAPSHOT_WRITE_CHUNK):
+                    cursor.executemany(SNAPSHOT_SQL, snapshots[i:i + SNAPSHOT_WRITE_CHUNK])
+                # Snapshots of accounts closed while this run was reading
+                cursor.execute("""
+                    DELETE s FROM balance_snapshots s
+                    LEFT JOIN accounts a ON a.account_number = s.account_number
+                    WHERE a.account_number IS NULL
+                """)
+    except Error as err:
+        print(f"Error reconciling balances: {err}")
+        raise
+
+    return {
+        "accounts": len(accounts),
+        "ledger_rows": ledger_rows,
+        "mismatches": mismatches,
+        "snapshots_written": len(snapshots) if write_snapshots else 0,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="do not write snapshots")
+    parser.add_argument("--full", action="store_true", help="ignore snapshots and re-derive every balance")
+    args = parser.parse_args()
+
+    setup_database()
+    report = reconcile(full=args.full, write_snapshots=not args.check)
+    print(f"Checked {report['accounts']} accounts and {report['ledger_rows']} ledger rows "
+          f"in {report['seconds']:.2f}s; wrote {report['snapshots_written']} snapshots.")
+    for mismatch in report["mismatches"]:
+        print(f"  account {mismatch.account_number} (transaction {mismatch.transaction_id}): "
+              f"{mismatch.reason} is {mismatch.actual}, ledger says {mismatch.expected}")
+    if report["mismatches"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Benchmarks for the weather dashboard, run against the local fake API.
+
+    python benchmark.py multi --cities 200 --concurrency 1 4 8 16 --latency 0.1
+    python benchmark.py forecast --cities 10 100 1000
+    python benchmark.py memory --cities 100 1000
+    python benchmark.py startup --reruns 10
+
+No API key or network access is needed.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+import fake_api
+from fake_api import FakeWeatherServer
+
+
+def start_fake_api(latency=0.0, error_rate=0.0):
+    """Starts the fake API and points weather_api at it. Call before importing weather_api."""
+    server = FakeWeatherServer(latency=latency, error_rate=error_rate).start()
+    os.environ["OPENWEATHER_BASE_URL"] = server.base_url
+    os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+    return server
+
+
+def bench_multi(args):
+    os.environ["WEATHER_API_CALLS_PER_MINUTE"] = str(args.quota)
+    os.environ["WEATHER_HTTP_POOL_SIZE"] = str(max(args.concurrency))
+    server = start_fake_api(args.latency)
+    import weather_api
+
+    cities = [f"Site {i}" for i in range(args.cities)]
+    print(f"{args.cities} cities, {args.latency * 1000:.0f} ms API latency, quota {args.quota:.0f} calls/minute")
+    print(f"{'concurrency':>11} {'seconds':>9} {'cities/s':>10} {'api calls':>10}")
+    for concurrency in args.concurrency:
+        weather_api.cache.clear()
+        _, stats = weather_api.fetch_cities(cities, concurrency)
+        print(f"{concurrency:>11} {stats['seconds']:>9.3f} {stats['cities_per_second']:>10.1f} {stats['api_calls']:>10}")
+
+    started = time.perf_counter()
+    _, stats = weather_api.fetch_cities(cities, max(args.concurrency))
+    print(f"{'cached':>11} {time.perf_counter() - started:>9.3f} {stats['cities_per_second']:>10.1f} {stats['api_calls']:>10}")
+    print(f"requests served by the fake API: {dict(server.requests)}")
+
+
+def python_daily_forecasts(forecasts):
+    """Reference implementation: the same daily aggregates with a loop over every entry dict."""
+    days = defaultdict(lambda: {"temps": [], "conditions": Counter(), "rain_mm": 0.0, "snow_mm": 0.0})
+    for city, data in forecasts.items():
+        offset = data["city"]["timezone"]
+        for entry in data["list"]:
+            day = days[(city, (entry["dt"] + offset) // 86400)]
+            day["temps"].append(entry["main"]["temp"])
+            day["conditions"][entry["weather"][0]["description"]] += 1
+            day["rain_mm"] += entry.get("rain", {}).get("3h", 0.0)
+            day["snow_mm"] += entry.get("snow", {}).get("3h", 0.0)
+    return [
+        (city, local_day, min(day["temps"]), max(day["temps"]), sum(day["temps"]) / len(day["temps"]),
+         day["conditions"].most_common(1)[0][0], day["rain_mm"] + day["snow_mm"])
+        for (city, local_day), day in days.items()
+    ]
+
+
+def bench_forecast(args):
+    import pandas  # daily_forecasts imports it on first use; load it before timing
+
+    from forecast import daily_forecast, daily_forecasts
+    from models import Forecast
+
+    print(f"{'cities':>7} {'loop s':>9} {'parse s':>9} {'per-city s':>11} {'batch s':>9} {'days':>7}")
+    for count in args.cities:
+        forecasts = {f"Site {i}": fake_api.forecast(f"Site {i}") for i in range(count)}
+
+        started = time.perf_counter()
+        expected = python_daily_forecasts(forecasts)
+        loop_seconds = time.perf_counter() - started
+
+        # Parsing happens once at fetch time; the models are what the cache holds
+        started = time.perf_counter()
+        models = {city: Forecast.from_json(data) for city, data in forecasts.items()}
+        parse_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for data in models.values():
+            daily_forecast(data)
+        per_city_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        daily = daily_forecasts(models)
+        batch_seconds = time.perf_counter() - started
+
+        if len(daily) != len(expected):
+            raise AssertionError(f"{len(daily)} daily rows, expected {len(expected)}")
+        print(
+            f"{count:>7} {loop_seconds:>9.3f} {parse_seconds:>9.3f} {per_city_seconds:>11.3f} "
+            f"{batch_seconds:>9.3f} {len(daily):>7}"
+        )
+
+
+def retained_bytes(build):
+    """Bytes still allocated by the object build() returns, and the seconds it took."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    value = build()
+    seconds = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return size, seconds
+
+
+def bench_memory(args):
+    import models
+
+    print(f"JSON decoder: {'orjson' if models.orjson is not None else 'json (install orjson for faster parsing)'}")
+    print(f"{'cities':>7} {'raw dicts':>12} {'models':>12} {'saved':>7} {'json.loads s':>13} {'parse s':>9}")
+    for count in args.cities:
+        # Response bodies as they arrive from the API: current weather plus forecast per city
+        bodies = [
+            (endpoint, json.dumps(build(f"Site {i}")).encode("utf-8"))
+            for i in range(count)
+            for endpoint, build in (("weather", fake_api.current_weather), ("forecast", fake_api.forecast))
+        ]
+        raw_size, _ = retained_bytes(lambda: [json.loads(body) for _, body in bodies])
+        model_size, _ = retained_bytes(lambda: [models.parse_response(endpoint, body) for endpoint, body in bodies])
+
+        started = time.perf_counter()
+        for _, body in bodies:
+            json.loads(body)
+        loads_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        for endpoint, body in bodies:
+            models.parse_response(endpoint, body)
+        parse_seconds = time.perf_counter() - started
+
+        print(
+            f"{count:>7} {raw_size / 2**20:>9.2f} MiB {model_size / 2**20:>9.2f} MiB "
+            f"{1 - model_size / raw_size:>6.0%} {loads_seconds:>13.3f} {parse_seconds:>9.3f}"
+        )
+
+
+# Runs in a fresh interpreter so the first run pays for every import, like a new server process
+STARTUP_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+app, page, reruns = sys.argv[1], json.loads(sys.argv[2]), int(sys.argv[3])
+at = AppTest.from_file(app, default_timeout=120)
+for key, value in page.get("session_state", {}).items():
+    at.session_state[key] = value
+
+def timed_run():
+    started = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    return time.perf_counter() - started
+
+cold = timed_run()
+first_visit = cold
+if "widget" in page:
+    kind, index, value = page["widget"]
+    root = at.sidebar if page.get("sidebar") else at
+    getattr(root, kind)[index].set_value(value)
+    first_visit = timed_run()
+warm = [timed_run() for _ in range(reruns)]
+print(json.dumps({"cold": cold, "first_visit": first_visit, "warm": warm}))
+"""
+
+STARTUP_PAGES = {
+    "Single city": {},
+    "Multiple cities": {"widget": ["radio", 0, "Multiple cities"]},
+}
+
+
+def bench_startup(args):
+    start_fake_api(args.latency)
+    print(f"{'page':<16} {'cold start ms':>14} {'first visit ms':>15} {'warm rerun ms':>14}")
+    for name, page in STARTUP_PAGES.items():
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE, "weather_app.py", json.dumps(page), str(args.reruns)],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise SystemExit(f"{name}: {result.stderr.strip() or result.stdout.strip()}")
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"{name:<16} {timings['cold'] * 1000:>14.0f} {timings['first_visit'] * 1000:>15.0f} "
+            f"{statistics.median(timings['warm']) * 1000:>14.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    multi = commands.add_parser("multi", help="multi-city fetch throughput by concurrency")
+    multi.add_argument("--cities", type=int, default=200)
+    multi.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    multi.add_argument("--latency", type=float, default=0.1, help="seconds per fake API response")
+    multi.add_argument("--quota", type=float, default=100000, help="API calls per minute allowed")
+    multi.set_defaults(run=bench_multi)
+
+    forecast = commands.add_parser("forecast", help="daily forecast aggregation, loop vs vectorized")
+    forecast.add_argument("--cities", type=int, nargs="+", default=[10, 100, 1000])
+    forecast.set_defaults(run=bench_forecast)
+
+    memory = commands.add_parser("memory", help="memory held by cached raw JSON dicts vs parsed models")
+    memory.add_argument("--cities", type=int, nargs="+", default=[100, 1000])
+    memory.set_defaults(run=bench_memory)
+
+    startup = commands.add_parser("startup", help="cold start and warm rerun time of each mode of weather_app.py")
+    startup.add_argument("--reruns", type=int, default=10)
+    startup.add_argument("--latency", type=float, default=0.0, help="seconds per fake API response")
+    startup.set_defaults(run=bench_startup)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Local stand-in for the OpenWeatherMap 2.5 API, for development and benchmarks.
+
+    python fake_api.py --port 8765 --latency 0.05
+    OPENWEATHER_BASE_URL=http://127.0.0.1:8765/ streamlit run weather_app.py
+
+Serves /weather and /forecast with deterministic synthetic data. The city
+"nowhere" returns 404. Every request is counted per endpoint.
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CONDITIONS = ("clear sky", "few clouds", "scattered clouds", "light rain", "moderate rain", "snow")
+
+
+def _seed(city):
+    return zlib.crc32(city.casefold().encode("utf-8"))
+
+
+def current_weather(city, now=None):
+    seed = _seed(city)
+    now = int(now or time.time())
+    return {
+        "name": city.title(),
+        "sys": {"country": "XX"},
+        "dt": now,
+        "timezone": (seed % 25 - 12) * 3600,
+        "main": {
+            "temp": round(seed % 35 - 5 + 0.5, 2),
+            "feels_like": round(seed % 35 - 7 + 0.5, 2),
+            "humidity": seed % 100,
+        },
+        "wind": {"speed": round(seed % 150 / 10, 1)},
+        "weather": [{"description": CONDITIONS[seed % len(CONDITIONS)]}],
+    }
+
+
+def forecast(city, now=None):
+    seed = _seed(city)
+    start = int(now or time.time()) // 10800 * 10800
+    entries = []
+    for step in range(40):
+        description = CONDITIONS[(seed + step) % len(CONDITIONS)]
+        entry = {
+            "dt": start + step * 10800,
+            "main": {"temp": round(seed % 30 - 5 + (step % 8) * 1.5, 2), "humidity": (seed + step) % 100},
+            "weather": [{"description": description}],
+        }
+        if "rain" in description:
+            entry["rain"] = {"3h": round((seed + step) % 40 / 10, 2)}
+        elif description == "snow":
+            entry["snow"] = {"3h": round((seed + step) % 20 / 10, 2)}
+        entries.append(entry)
+    return {
+        "cnt": len(entries),
+        "list": entries,
+        "city": {"name": city.title(), "country": "XX", "timezone": (seed % 25 - 12) * 3600},
+    }
+
+
+class FakeWeatherServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops connections under parallel load
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, error_rate=0.0):
+        super().__init__(address, FakeWeatherHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def count(self, endpoint):
+        with self._lock:
+            self.requests[endpoint] += 1
+            return self.requests[endpoint]
+
+    def start(self):
+        """Serves in a background thread and returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class FakeWeatherHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.strip("/").rsplit("/", 1)[-1]
+        city = parse_qs(url.query).get("q", [""])[0]
+        number = self.server.count(endpoint)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.server.error_rate and number % round(1 / self.server.error_rate) == 0:
+            self._send(503, {"cod": 503, "message": "service unavailable"})
+        elif endpoint not in ("weather", "forecast"):
+            self._send(404, {"cod": 404, "message": "unknown endpoint"})
+        elif not city or city.casefold() == "nowhere":
+            self._send(404, {"cod": "404", "message": "city not found"})
+        elif endpoint == "weather":
+            self._send(200, current_weather(city))
+        else:
+            self._send(200, forecast(city))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server = FakeWeatherServer((args.host, args.port), latency=args.latency, error_rate=args.error_rate)
+    print(f"Fake OpenWeatherMap API on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
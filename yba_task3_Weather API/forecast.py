@@ -0,0 +1,108 @@
+from collections import namedtuple
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+DAILY_COLUMNS = [
+    "city", "date", "temp_min", "temp_max", "temp_mean",
+    "condition", "rain_mm", "snow_mm", "precipitation_mm", "periods",
+]
+
+# One row of daily_forecast()
+DailySummary = namedtuple("DailySummary", DAILY_COLUMNS)
+
+
+def _columns(forecasts):
+    """
+    Concatenates the typed arrays of many Forecast models (see models.py) into
+    NumPy columns with one value per 3-hour entry. Condition codes are local
+    to each forecast, so they are remapped to one shared list of names.
+    """
+    cities, city_index, local_time, temp, condition, rain, snow = [], [], [], [], [], [], []
+    names = {}
+    for city, data in forecasts.items():
+        if not data:
+            continue
+        codes = np.array([names.setdefault(name, len(names)) for name in data.conditions], dtype=np.int64)
+        city_index.append(np.full(len(data), len(cities), dtype=np.int64))
+        cities.append(city)
+        local_time.append(np.frombuffer(data.dt, dtype=np.int64) + data.timezone)
+        temp.append(np.frombuffer(data.temp, dtype=np.float64))
+        condition.append(codes[np.frombuffer(data.condition, dtype=np.uint8)])
+        rain.append(np.frombuffer(data.rain, dtype=np.float64))
+        snow.append(np.frombuffer(data.snow, dtype=np.float64))
+    if not cities:
+        return None
+    columns = (np.concatenate(column) for column in (city_index, local_time, temp, condition, rain, snow))
+    return (cities, *columns, list(names))
+
+
+def _daily_columns(forecasts):
+    """
+    Entries are grouped by city and local calendar day (using the response's
+    timezone offset) and reduced to min/max/mean temperature, the most
+    frequent condition (ties go to the one seen first that day), rain/snow/total
+    precipitation in mm and the number of 3-hour periods the day covers.
+    Returns a dict of DAILY_COLUMNS arrays ordered by city, then date, or None
+    if there are no entries.
+    """
+    columns = _columns(forecasts)
+    if columns is None or len(columns[1]) == 0:
+        return None
+    cities, city_index, local_time, temp, condition_code, rain, snow, condition_names = columns
+
+    # One integer key per (city, local day); np.unique sorts them by city then day
+    local_day = local_time // SECONDS_PER_DAY
+    first_day = local_day.min()
+    key = city_index * (local_day.max() - first_day + 1) + (local_day - first_day)
+    keys, group = np.unique(key, return_inverse=True)
+    groups = len(keys)
+
+    periods = np.bincount(group, minlength=groups)
+    order = np.argsort(group, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(periods)[:-1]))
+    rain_mm = np.bincount(group, weights=rain, minlength=groups)
+    snow_mm = np.bincount(group, weights=snow, minlength=groups)
+
+    # Count each condition per group and keep the most frequent; on a tie the
+    # condition whose first entry that day comes earliest wins
+    cell = group * len(condition_names) + condition_code
+    condition_counts = np.bincount(cell, minlength=groups * len(condition_names))
+    first_seen = np.full(len(condition_counts), len(cell), dtype=np.int64)
+    np.minimum.at(first_seen, cell, np.arange(len(cell)))
+    score = (condition_counts * (len(cell) + 1) - first_seen).reshape(groups, len(condition_names))
+
+    group_city = city_index[order][starts]
+    group_day = local_day[order][starts]
+    return {
+        "city": np.array(cities, dtype=object)[group_city],
+        "date": group_day.astype("datetime64[D]").astype(object),
+        "temp_min": np.minimum.reduceat(temp[order], starts),
+        "temp_max": np.maximum.reduceat(temp[order], starts),
+        "temp_mean": np.bincount(group, weights=temp, minlength=groups) / periods,
+        "condition": np.asarray(condition_names, dtype=object)[score.argmax(axis=1)],
+        "rain_mm": rain_mm,
+        "snow_mm": snow_mm,
+        "precipitation_mm": rain_mm + snow_mm,
+        "periods": periods,
+    }
+
+
+def daily_forecasts(forecasts):
+    """
+    Daily summaries for many cities at once, as a DataFrame with one row per
+    city and local day (see _daily_columns). forecasts maps a city name to its
+    Forecast; failed fetches (None) are skipped.
+    """
+    # pandas is only needed for batch results, so the single-city page doesn't load it
+    import pandas as pd
+
+    return pd.DataFrame(_daily_columns(forecasts), columns=DAILY_COLUMNS)
+
+
+def daily_forecast(forecast):
+    """Daily summary of one city's Forecast as a list of DailySummary rows, in date order."""
+    columns = _daily_columns({forecast.name: forecast})
+    if columns is None:
+        return []
+    return [DailySummary(*row) for row in zip(*(columns[name].tolist() for name in DAILY_COLUMNS))]
@@ -0,0 +1,152 @@
+"""
+Compact parsed forms of OpenWeatherMap responses.
+
+Responses are parsed once, when they are fetched, and only these objects
+are cached. CurrentWeather keeps the handful of fields the app shows in
+__slots__; Forecast keeps its 3-hour entries as typed arrays instead of 40
+nested dicts.
+"""
+import json
+from array import array
+
+try:
+    import orjson
+except ImportError:  # optional, roughly 2-3x faster than the json module
+    orjson = None
+
+
+def json_loads(data):
+    """Decodes a JSON response body (bytes or str), with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class CurrentWeather:
+    """Current conditions for one city, from the /weather endpoint."""
+
+    __slots__ = ("name", "country", "dt", "timezone", "temp", "feels_like", "humidity", "wind_speed", "description")
+
+    def __init__(self, name, country, dt, timezone, temp, feels_like, humidity, wind_speed, description):
+        self.name = name
+        self.country = country
+        self.dt = dt
+        self.timezone = timezone
+        self.temp = temp
+        self.feels_like = feels_like
+        self.humidity = humidity
+        self.wind_speed = wind_speed
+        self.description = description
+
+    @classmethod
+    def from_json(cls, data):
+        main = data["main"]
+        return cls(
+            name=data["name"],
+            country=data.get("sys", {}).get("country", ""),
+            dt=data.get("dt", 0),
+            timezone=data.get("timezone", 0),
+            temp=main["temp"],
+            feels_like=main.get("feels_like", main["temp"]),
+            humidity=main.get("humidity", 0),
+            wind_speed=data.get("wind", {}).get("speed", 0.0),
+            description=data["weather"][0]["description"] if data.get("weather") else "",
+        )
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class Forecast:
+    """
+    5-day / 3-hour forecast for one city, from the /forecast endpoint.
+    Entry i is (dt[i], temp[i], humidity[i], conditions[condition[i]],
+    rain[i], snow[i]); rain and snow are mm over the 3 hours.
+    """
+
+    __slots__ = ("name", "country", "timezone", "dt", "temp", "humidity", "condition", "conditions", "rain", "snow")
+
+    def __init__(self, name, country, timezone, dt, temp, humidity, condition, conditions, rain, snow):
+        self.name = name
+        self.country = country
+        self.timezone = timezone
+        self.dt = dt
+        self.temp = temp
+        self.humidity = humidity
+        self.condition = condition
+        self.conditions = conditions
+        self.rain = rain
+        self.snow = snow
+
+    def __len__(self):
+        return len(self.dt)
+
+    @classmethod
+    def from_json(cls, data):
+        entries = data.get("list", [])
+        city = data.get("city", {})
+        codes = {}
+        condition = array("B")
+        for entry in entries:
+            description = entry["weather"][0]["description"] if entry.get("weather") else ""
+            condition.append(codes.setdefault(description, len(codes)))
+        return cls(
+            name=city.get("name", ""),
+            country=city.get("country", ""),
+            timezone=city.get("timezone", 0),
+            dt=array("q", (entry["dt"] for entry in entries)),
+            temp=array("d", (entry["main"]["temp"] for entry in entries)),
+            humidity=array("B", (entry["main"].get("humidity", 0) for entry in entries)),
+            condition=condition,
+            conditions=tuple(codes),
+            rain=array("d", (entry.get("rain", {}).get("3h", 0.0) for entry in entries)),
+            snow=array("d", (entry.get("snow", {}).get("3h", 0.0) for entry in entries)),
+        )
+
+    def to_dict(self):
+        return {
+            field: list(value) if isinstance(value, (array, tuple)) else value
+            for field, value in ((field, getattr(self, field)) for field in self.__slots__)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            name=data["name"],
+            country=data["country"],
+            timezone=data["timezone"],
+            dt=array("q", data["dt"]),
+            temp=array("d", data["temp"]),
+            humidity=array("B", data["humidity"]),
+            condition=array("B", data["condition"]),
+            conditions=tuple(data["conditions"]),
+            rain=array("d", data["rain"]),
+            snow=array("d", data["snow"]),
+        )
+
+
+MODELS = {"weather": CurrentWeather, "forecast": Forecast}
+
+
+def parse_response(endpoint, body):
+    """Parses a raw response body from endpoint into its compact model."""
+    return MODELS[endpoint].from_json(json_loads(body))
+
+
+def encode(value):
+    """Serializes a model for the on-disk cache."""
+    kind = next(endpoint for endpoint, model in MODELS.items() if isinstance(value, model))
+    return json.dumps({"kind": kind, "data": value.to_dict()})
+
+
+def decode(payload):
+    """Inverse of encode. Returns None for payloads it does not recognize, such as raw JSON cached by older versions."""
+    data = json.loads(payload)
+    model = MODELS.get(data.get("kind")) if isinstance(data, dict) else None
+    if model is None:
+        return None
+    return model.from_dict(data["data"])
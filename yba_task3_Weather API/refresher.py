@@ -0,0 +1,147 @@
+import threading
+import time
+
+from response_cache import normalize_city
+
+
+class BackgroundRefresher:
+    """
+    Keeps cached responses for recently requested and pinned cities fresh.
+
+    A daemon thread wakes every interval seconds and refreshes any tracked
+    entry older than refresh_ahead * TTL, so readers rarely see an expired
+    entry. Cities not requested for recent_window seconds stop being tracked
+    unless they are pinned. refresh(endpoint, city) is the fetch-and-store
+    callable; it must return False (or raise) on failure.
+    """
+
+    def __init__(self, cache, refresh, interval=30, refresh_ahead=0.8, recent_window=3600):
+        self.cache = cache
+        self._refresh = refresh
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.recent_window = recent_window
+        self._tracked = {}  # (endpoint, normalized city) -> (city, last_requested)
+        self._pinned = {}  # normalized city -> city
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.refreshes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_failure = None
+        self.last_failure_at = None
+        self.last_run = None
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="weather-refresher", daemon=True)
+                self._thread.start()
+
+    def touch(self, endpoint, city):
+        """Records that a page asked for this city, and starts the refresher on first use."""
+        with self._lock:
+            self._tracked[(endpoint, normalize_city(city))] = (city, time.time())
+        self.start()
+
+    def pin(self, city, endpoints=("weather", "forecast")):
+        with self._lock:
+            self._pinned[normalize_city(city)] = city
+            for endpoint in endpoints:
+                self._tracked.setdefault((endpoint, normalize_city(city)), (city, time.time()))
+        self.start()
+
+    def unpin(self, city):
+        with self._lock:
+            self._pinned.pop(normalize_city(city), None)
+
+    def is_pinned(self, city):
+        with self._lock:
+            return normalize_city(city) in self._pinned
+
+    def pinned(self):
+        with self._lock:
+            return list(self._pinned.values())
+
+    def refresh_now(self, endpoint, city):
+        """
+        Refreshes one entry on the calling thread unless a refresh for it is
+        already running. Returns True if the refresh succeeded.
+        """
+        key = (endpoint, normalize_city(city))
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+        age = self.cache.age(endpoint, city)
+        error = None
+        try:
+            ok = bool(self._refresh(endpoint, city))
+        except Exception as e:
+            ok = False
+            error = str(e)
+        with self._lock:
+            self._in_flight.discard(key)
+            if ok:
+                self.refreshes += 1
+                self.consecutive_failures = 0
+                if age is not None:
+                    # How long after the refresh-ahead point the refresh happened
+                    lag = max(0.0, age - self.cache.ttl_for(endpoint) * self.refresh_ahead)
+                    self._total_lag += lag
+                    self.max_lag = max(self.max_lag, lag)
+            else:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_failure = f"{endpoint} {city}: {error or 'fetch failed'}"
+                self.last_failure_at = time.time()
+        return ok
+
+    def _due(self):
+        now = time.time()
+        due = []
+        with self._lock:
+            for key, (city, last_requested) in list(self._tracked.items()):
+                endpoint, normalized = key
+                if normalized not in self._pinned and now - last_requested > self.recent_window:
+                    del self._tracked[key]
+                    continue
+                due.append((endpoint, city))
+        refresh_due = []
+        for endpoint, city in due:
+            age = self.cache.age(endpoint, city)
+            if age is None or age >= self.cache.ttl_for(endpoint) * self.refresh_ahead:
+                refresh_due.append((endpoint, city))
+        return refresh_due
+
+    def run_once(self):
+        """Refreshes every due entry once. Returns the number refreshed successfully."""
+        refreshed = sum(1 for endpoint, city in self._due() if self.refresh_now(endpoint, city))
+        self.last_run = time.time()
+        return refreshed
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                self.last_failure = f"refresher: {e}"
+            time.sleep(self.interval)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracked": len(self._tracked),
+                "pinned": len(self._pinned),
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "consecutive_failures": self.consecutive_failures,
+                "last_failure": self.last_failure,
+                "last_failure_at": self.last_failure_at,
+                "average_lag_seconds": self._total_lag / self.refreshes if self.refreshes else 0.0,
+                "max_lag_seconds": self.max_lag,
+                "last_run": self.last_run,
+            }
@@ -0,0 +1,181 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_city(city):
+    """Cache key form of a city name: trimmed, single-spaced and case-folded."""
+    return " ".join(city.split()).casefold()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache for API responses with a TTL per endpoint.
+
+    Entries are kept in memory; if db_path is given they are also written to a
+    SQLite file so the cache survives restarts. Rows older than retain seconds
+    (never less than the longest TTL) are deleted from the file on startup and then
+    at most every PRUNE_INTERVAL seconds on write. Keys are (endpoint, city)
+    pairs. encode/decode convert values to and from the stored text; a
+    payload that decodes to None is treated as missing.
+    """
+
+    PRUNE_INTERVAL = 60  # seconds
+
+    def __init__(self, ttls, max_entries=512, db_path=None, default_ttl=600, encode=json.dumps, decode=json.loads,
+                 retain=None):
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.retain = max([retain or 0, default_ttl, *self.ttls.values()])
+        self.max_entries = max_entries
+        self._encode = encode
+        self._decode = decode
+        self._entries = OrderedDict()  # key -> (stored_at, value), least recently used first
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    endpoint TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (endpoint, city)
+                )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_stored_at ON responses (stored_at)")
+            self._prune_locked(time.time())
+
+    def _prune_locked(self, now):
+        """Deletes rows older than retain from the SQLite file and commits."""
+        self._db.execute("DELETE FROM responses WHERE stored_at < ?", (now - self.retain,))
+        self._db.commit()
+        self._next_prune = now + self.PRUNE_INTERVAL
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def _key(self, endpoint, city):
+        return endpoint, normalize_city(city)
+
+    def _remember(self, key, stored_at, value):
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load_from_disk(self, key):
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT stored_at, payload FROM responses WHERE endpoint = ? AND city = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        value = self._decode(row[1])
+        return None if value is None else (row[0], value)
+
+    def _find_locked(self, key):
+        """Returns (stored_at, value, from_disk) for any cached entry, or None."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry[0], entry[1], False
+        entry = self._load_from_disk(key)
+        if entry is not None:
+            self._remember(key, *entry)
+            return entry[0], entry[1], True
+        return None
+
+    def get(self, endpoint, city):
+        """Returns the cached response if it is younger than the endpoint's TTL, else None."""
+        found = self.lookup(endpoint, city)
+        if found is None or found[1] >= self.ttl_for(endpoint):
+            return None
+        return found[0]
+
+    def lookup(self, endpoint, city):
+        """
+        Returns (response, age_seconds) for a cached response even if it is past
+        its TTL, so callers can serve stale data, or None if nothing is cached.
+        """
+        key = self._key(endpoint, city)
+        with self._lock:
+            found = self._find_locked(key)
+            if found is None:
+                self.misses += 1
+                return None
+            stored_at, value, from_disk = found
+            age = time.time() - stored_at
+            if age >= self.ttl_for(endpoint):
+                self.stale_hits += 1
+            elif from_disk:
+                self.disk_hits += 1
+            else:
+                self.hits += 1
+            return value, age
+
+    def age(self, endpoint, city):
+        """
+        Seconds since the cached response was stored, or None. A read-only
+        peek for the background refresher: not counted as a lookup, and it
+        neither changes LRU order nor loads entries from disk into memory.
+        """
+        key = self._key(endpoint, city)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at = entry[0]
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT stored_at FROM responses WHERE endpoint = ? AND city = ?", key
+                ).fetchone()
+                stored_at = row[0] if row is not None else None
+            else:
+                stored_at = None
+        return None if stored_at is None else time.time() - stored_at
+
+    def set(self, endpoint, city, value):
+        key = self._key(endpoint, city)
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (endpoint, city, stored_at, payload) VALUES (?, ?, ?, ?)",
+                    (*key, stored_at, self._encode(value)),
+                )
+                if stored_at >= self._next_prune:
+                    self._prune_locked(stored_at)
+                else:
+                    self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
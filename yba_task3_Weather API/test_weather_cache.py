@@ -0,0 +1,191 @@
+"""
+Response cache tests against the local fake API (fake_api.py).
+
+    python -m pytest -q
+
+Each test imports a fresh weather_api pointed at a FakeWeatherServer on a
+free port, and checks how many requests actually reached it.
+"""
+import importlib
+import time
+
+import pytest
+
+from fake_api import FakeWeatherServer
+
+
+@pytest.fixture
+def server():
+    server = FakeWeatherServer(("127.0.0.1", 0)).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def load_weather_api(server, monkeypatch):
+    """
+    Returns a function that (re)imports weather_api with the given settings.
+    Retries are off so a failure is one request, expired entries are refetched
+    before serving, and the background refresher never runs.
+    """
+    def load(**settings):
+        env = {
+            "OPENWEATHER_BASE_URL": server.base_url,
+            "OPENWEATHER_API_KEY": "test",
+            "WEATHER_MAX_RETRIES": "0",
+            "WEATHER_API_CALLS_PER_MINUTE": "6000",
+            "WEATHER_STALE_MAX_AGE": "0",
+            "WEATHER_PINNED_CITIES": "",
+        }
+        env.update(settings)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        import refresher
+
+        monkeypatch.setattr(refresher.BackgroundRefresher, "start", lambda self: None)
+        import weather_api
+
+        return importlib.reload(weather_api)
+
+    return load
+
+
+def test_entries_expire_after_their_endpoints_ttl(server, load_weather_api):
+    weather_api = load_weather_api(WEATHER_CACHE_TTL="0.3", FORECAST_CACHE_TTL="60")
+    weather_api.get_weather("London")
+    weather_api.get_forecast("London")
+    time.sleep(0.4)
+
+    weather_api.get_weather("London")
+    weather_api.get_forecast("London")
+    assert server.requests == {"weather": 2, "forecast": 1}
+
+
+def test_least_recently_used_entry_is_evicted(server, load_weather_api):
+    weather_api = load_weather_api(WEATHER_CACHE_MAX_ENTRIES="2")
+    weather_api.get_weather("London")
+    weather_api.get_weather("Paris")
+    weather_api.get_weather("London")  # Paris is now the least recently used
+    weather_api.get_weather("Tokyo")
+    assert server.requests["weather"] == 3
+
+    weather_api.get_weather("London")
+    assert server.requests["weather"] == 3
+    weather_api.get_weather("Paris")
+    assert server.requests["weather"] == 4
+    assert weather_api.cache_stats()["evictions"] == 2
+
+
+def test_city_names_share_one_entry_after_normalization(server, load_weather_api):
+    weather_api = load_weather_api()
+    first = weather_api.get_weather("New York")
+    again = weather_api.get_weather("  new   YORK ")
+    assert server.requests["weather"] == 1
+    assert again is first
+
+
+def test_sqlite_cache_survives_a_restart(server, load_weather_api, tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    weather_api = load_weather_api(WEATHER_CACHE_DB=db_path)
+    stored = weather_api.get_forecast("Oslo")
+
+    # A new process: fresh module, empty memory cache, same SQLite file
+    weather_api = load_weather_api(WEATHER_CACHE_DB=db_path)
+    loaded = weather_api.get_forecast("oslo")
+    assert server.requests["forecast"] == 1
+    assert weather_api.cache_stats()["disk_hits"] == 1
+    assert loaded.to_dict() == stored.to_dict()
+
+
+def test_not_found_is_not_cached(server, load_weather_api):
+    weather_api = load_weather_api()
+    assert weather_api.get_weather("Nowhere") is None
+    assert weather_api.get_weather("Nowhere") is None
+    assert server.requests["weather"] == 2
+
+
+def test_failed_response_is_not_cached(server, load_weather_api):
+    weather_api = load_weather_api()
+    server.error_rate = 1.0
+    assert weather_api.get_weather("Berlin") is None
+    assert server.requests["weather"] == 1
+
+    server.error_rate = 0.0
+    assert weather_api.get_weather("Berlin") is not None
+    assert weather_api.get_weather("Berlin") is not None
+    assert server.requests["weather"] == 2
+
+
+def test_cache_hits_do_not_wait_behind_stale_refreshes(server, load_weather_api):
+    weather_api = load_weather_api(
+        WEATHER_CACHE_TTL="0.3", FORECAST_CACHE_TTL="0.3", WEATHER_STALE_MAX_AGE="86400",
+        WEATHER_API_CALLS_PER_MINUTE="60",
+    )
+    cities = [f"City {number}" for number in range(30)]
+    try:
+        # Use up the whole quota, then let every entry go stale
+        for city in cities:
+            weather_api.get_weather_and_forecast(city)
+        time.sleep(0.4)
+
+        # A stale dashboard: served at once, with refreshes queued on the quota
+        results, stats = weather_api.fetch_cities(cities)
+        assert all(results.values()) and stats["api_calls"] == 0
+
+        started = time.perf_counter()
+        weather, forecast, timings = weather_api.get_weather_and_forecast("City 0")
+        assert time.perf_counter() - started < 0.5
+        assert weather is not None and forecast is not None
+        assert all(call["cached"] for call in timings["calls"])
+    finally:
+        # Drain the queued refreshes quickly, before the next test reloads weather_api
+        weather_api.rate_limiter.rate = 1e6
+        weather_api.refresh_executor.shutdown(wait=True)
+
+
+def test_failures_record_their_reason(server, load_weather_api):
+    weather_api = load_weather_api()
+    server.error_rate = 1.0
+    results, stats = weather_api.fetch_cities(["Nowhere", "Berlin"])
+    assert results == {"Nowhere": None, "Berlin": None}
+    assert stats["errors"] == {"Nowhere": "HTTP 503", "Berlin": "HTTP 503"}
+
+    server.error_rate = 0.0
+    _, stats = weather_api.fetch_cities(["Nowhere", "Berlin"])
+    assert stats["errors"] == {"Nowhere": "City not found"}
+
+
+def test_retries_take_rate_limiter_tokens(server, load_weather_api):
+    weather_api = load_weather_api(WEATHER_MAX_RETRIES="2", WEATHER_RETRY_BACKOFF="0.01")
+    server.error_rate = 1.0
+    timing = {}
+    assert weather_api.get_weather("Berlin", timing) is None
+    assert server.requests["weather"] == 3
+    assert timing["attempts"] == 3
+    assert weather_api.rate_limiter.stats()["acquired"] == 3
+
+
+def test_age_polling_does_not_keep_entries_recent():
+    from response_cache import ResponseCache
+
+    cache = ResponseCache({"weather": 600}, max_entries=2)
+    cache.set("weather", "London", "a")
+    cache.set("weather", "Paris", "b")
+    # What the background refresher does on every pass
+    assert cache.age("weather", "London") is not None
+    cache.set("weather", "Tokyo", "c")
+    assert cache.lookup("weather", "London") is None
+    assert cache.lookup("weather", "Paris") is not None
+
+
+def test_sqlite_cache_drops_expired_rows(tmp_path):
+    from response_cache import ResponseCache
+
+    db_path = str(tmp_path / "cache.db")
+    cache = ResponseCache({"weather": 0.2}, db_path=db_path, default_ttl=0.2)
+    cache.set("weather", "London", "a")
+    time.sleep(0.3)
+
+    reopened = ResponseCache({"weather": 0.2}, db_path=db_path, default_ttl=0.2)
+    assert reopened._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
@@ -0,0 +1,338 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from models import decode, encode, parse_response
+from rate_limit import TokenBucket
+from refresher import BackgroundRefresher
+from response_cache import ResponseCache, normalize_city
+
+# Load environment variables
+load_dotenv()
+
+# Initialize API settings
+API_KEY = os.getenv('OPENWEATHER_API_KEY')
+BASE_URL = os.getenv('OPENWEATHER_BASE_URL', "http://api.openweathermap.org/data/2.5/")  # Changed from 3.0 to 2.5
+
+# HTTP settings
+CONNECT_TIMEOUT = float(os.getenv('WEATHER_CONNECT_TIMEOUT', '3.05'))  # seconds
+READ_TIMEOUT = float(os.getenv('WEATHER_READ_TIMEOUT', '10'))  # seconds
+MAX_RETRIES = int(os.getenv('WEATHER_MAX_RETRIES', '3'))
+RETRY_BACKOFF = float(os.getenv('WEATHER_RETRY_BACKOFF', '0.3'))  # seconds, doubled on each retry
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+HTTP_POOL_SIZE = int(os.getenv('WEATHER_HTTP_POOL_SIZE', '10'))
+
+# API quota (the free plan allows 60 calls per minute) and multi-city fetch concurrency
+CALLS_PER_MINUTE = float(os.getenv('WEATHER_API_CALLS_PER_MINUTE', '60'))
+MULTI_CITY_CONCURRENCY = int(os.getenv('WEATHER_MULTI_CITY_CONCURRENCY', '8'))
+
+# Cache settings: current weather changes quickly, forecasts are refreshed less often
+WEATHER_TTL = float(os.getenv('WEATHER_CACHE_TTL', '600'))  # seconds
+FORECAST_TTL = float(os.getenv('FORECAST_CACHE_TTL', '3600'))  # seconds
+CACHE_MAX_ENTRIES = int(os.getenv('WEATHER_CACHE_MAX_ENTRIES', '512'))
+CACHE_DB_PATH = os.getenv('WEATHER_CACHE_DB')  # optional SQLite file for persistence
+
+# Background refresh: entries are refreshed once they reach REFRESH_AHEAD of their TTL.
+# Entries older than STALE_MAX_AGE are refetched before serving, unless the API is down.
+REFRESH_INTERVAL = float(os.getenv('WEATHER_REFRESH_INTERVAL', '30'))  # seconds
+REFRESH_AHEAD = float(os.getenv('WEATHER_REFRESH_AHEAD', '0.8'))
+REFRESH_RECENT_WINDOW = float(os.getenv('WEATHER_REFRESH_RECENT_WINDOW', '3600'))  # seconds
+STALE_MAX_AGE = float(os.getenv('WEATHER_STALE_MAX_AGE', '86400'))  # seconds
+REFRESH_WORKERS = int(os.getenv('WEATHER_REFRESH_WORKERS', '2'))
+PINNED_CITIES = [city.strip() for city in os.getenv('WEATHER_PINNED_CITIES', '').split(',') if city.strip()]
+
+# Shared by every session in this process; this module is imported once, so the
+# cache survives Streamlit reruns
+cache = ResponseCache(
+    {"weather": WEATHER_TTL, "forecast": FORECAST_TTL},
+    max_entries=CACHE_MAX_ENTRIES,
+    db_path=CACHE_DB_PATH,
+    encode=encode,
+    decode=decode,
+    retain=STALE_MAX_AGE,
+)
+
+
+def _create_session():
+    """
+    A keep-alive session whose connection pool is shared by all threads.
+    Retries are done by _fetch, not urllib3, so each attempt is rate limited.
+    """
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+session = _create_session()
+executor = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="weather-fetch")
+
+# Every HTTP call (not cache hits) takes a token, so all sessions share the API quota
+rate_limiter = TokenBucket(rate=CALLS_PER_MINUTE / 60, capacity=CALLS_PER_MINUTE)
+
+
+def _retry_delay(response, attempt):
+    """Seconds to wait after failed attempt number attempt, honouring Retry-After."""
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    if retry_after.isdigit():
+        return float(retry_after)
+    return RETRY_BACKOFF * 2 ** (attempt - 1)
+
+
+def _fetch(endpoint, city, timing=None):
+    """
+    GETs one endpoint and parses it into its compact model (see models.py).
+    Connection errors, 429 and 5xx responses are retried up to MAX_RETRIES
+    times with exponential backoff. Every attempt takes a rate limiter token,
+    so retries count against the API quota too.
+    If timing is a dict it is filled with the call's seconds, HTTP status,
+    number of attempts and, on failure, a short error message.
+    """
+    started = time.perf_counter()
+    response = None
+    error = None
+    attempts = 0
+    try:
+        while True:
+            rate_limiter.acquire()
+            attempts += 1
+            try:
+                response = session.get(
+                    f"{BASE_URL}{endpoint}",
+                    params={"q": city, "appid": API_KEY, "units": "metric"},
+                    timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempts > MAX_RETRIES:
+                    raise
+                time.sleep(_retry_delay(None, attempts))
+                continue
+            if response.status_code in RETRY_STATUSES and attempts <= MAX_RETRIES:
+                time.sleep(_retry_delay(response, attempts))
+                continue
+            break
+        response.raise_for_status()
+        return parse_response(endpoint, response.content)
+    # Messages are kept short: exception text would include the URL and its API key
+    except requests.exceptions.HTTPError:
+        error = "City not found" if response.status_code == 404 else f"HTTP {response.status_code}"
+        return None
+    except requests.exceptions.RequestException as e:
+        error = type(e).__name__
+        return None
+    except (ValueError, KeyError):
+        error = "Unexpected response"
+        return None
+    finally:
+        if timing is not None:
+            timing.update(
+                seconds=time.perf_counter() - started,
+                status=response.status_code if response is not None else None,
+                attempts=attempts,
+                error=error,
+            )
+
+
+def _refresh(endpoint, city):
+    """Fetches one endpoint and stores it in the cache. Returns True on success."""
+    value = _fetch(endpoint, city)
+    if value is not None:
+        cache.set(endpoint, city, value)
+    return value is not None
+
+
+refresher = BackgroundRefresher(
+    cache, _refresh, interval=REFRESH_INTERVAL, refresh_ahead=REFRESH_AHEAD, recent_window=REFRESH_RECENT_WINDOW
+)
+for pinned_city in PINNED_CITIES:
+    refresher.pin(pinned_city)
+
+# Stale-entry refreshes run on their own small pool, so a refresh waiting for
+# API quota never holds a worker that a page fetch needs
+refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="weather-refresh")
+_queued_refreshes = set()
+_queued_refreshes_lock = threading.Lock()
+
+
+def _schedule_refresh(endpoint, city):
+    """Queues a background refresh unless one for the same entry is already queued."""
+    key = (endpoint, normalize_city(city))
+    with _queued_refreshes_lock:
+        if key in _queued_refreshes:
+            return
+        _queued_refreshes.add(key)
+
+    def run():
+        try:
+            refresher.refresh_now(endpoint, city)
+        finally:
+            with _queued_refreshes_lock:
+                _queued_refreshes.discard(key)
+
+    refresh_executor.submit(run)
+
+
+def _lookup(endpoint, city, timing):
+    """
+    Cache half of _cached_fetch; never touches the network. Returns
+    (value, found): value is what can be served now (None if the API must be
+    called) and found is the cache lookup result.
+    """
+    timing.update(endpoint=endpoint, cached=True, stale=False, age=None, status=None, attempts=0, error=None)
+    found = cache.lookup(endpoint, city)
+    value = None
+    if found is not None:
+        value, age = found
+        timing["age"] = age
+        if age >= cache.ttl_for(endpoint):
+            timing["stale"] = True
+            if age < STALE_MAX_AGE:
+                _schedule_refresh(endpoint, city)
+            else:
+                value = None
+    return value, found
+
+
+def _complete(endpoint, city, value, found, timing, started):
+    """Network half of _cached_fetch: calls the API if _lookup found nothing servable."""
+    if value is None:
+        timing["cached"] = False
+        fresh = _fetch(endpoint, city, timing)
+        if fresh is not None:
+            cache.set(endpoint, city, fresh)
+            value = fresh
+            timing.update(stale=False, age=0.0)
+        elif found is not None:
+            # Upstream is failing: degrade to the last good response
+            value = found[0]
+
+    if value is not None:
+        # Keep cities people actually look at warm in the background
+        refresher.touch(endpoint, city)
+    timing["seconds"] = time.perf_counter() - started
+    return value
+
+
+def _cached_fetch(endpoint, city, timing=None):
+    """
+    Stale-while-revalidate lookup. Fresh entries are returned directly; stale
+    ones are returned at once while a background refresh runs. Only a missing
+    (or very old) entry blocks on the API, and if that call fails the old entry
+    is served instead of nothing.
+    If timing is a dict it is filled with the call's source, age and duration.
+    """
+    started = time.perf_counter()
+    if timing is None:
+        timing = {}
+    value, found = _lookup(endpoint, city, timing)
+    return _complete(endpoint, city, value, found, timing, started)
+
+
+def get_weather(city, timing=None):
+    """Get current weather for a city as a CurrentWeather"""
+    return _cached_fetch("weather", city, timing)
+
+
+def get_forecast(city, timing=None):
+    """Get 5-day forecast for a city as a Forecast"""
+    return _cached_fetch("forecast", city, timing)
+
+
+def get_weather_and_forecast(city):
+    """
+    Fetches current weather and forecast concurrently over the shared session.
+    The cache is checked on the calling thread, so cache hits never queue
+    behind other fetches; only misses go to the executor.
+    Returns (weather, forecast, timings) where timings has one entry per call
+    plus the total wall time.
+    """
+    started = time.perf_counter()
+    weather_timing, forecast_timing = {}, {}
+    values, futures = {}, {}
+    for endpoint, timing in (("weather", weather_timing), ("forecast", forecast_timing)):
+        call_started = time.perf_counter()
+        value, found = _lookup(endpoint, city, timing)
+        if value is None:
+            futures[endpoint] = executor.submit(_complete, endpoint, city, value, found, timing, call_started)
+        else:
+            values[endpoint] = _complete(endpoint, city, value, found, timing, call_started)
+    for endpoint, future in futures.items():
+        values[endpoint] = future.result()
+    weather, forecast = values["weather"], values["forecast"]
+    timings = {
+        "calls": [weather_timing, forecast_timing],
+        "total_seconds": time.perf_counter() - started,
+    }
+    return weather, forecast, timings
+
+
+def parse_city_list(text):
+    """
+    Splits user input (one city per line, or comma/semicolon separated) into
+    city names, dropping blanks and duplicates while keeping the first spelling.
+    """
+    cities = {}
+    for line in text.splitlines():
+        for part in line.replace(";", ",").split(","):
+            city = " ".join(part.split())
+            if city and normalize_city(city) not in cities:
+                cities[normalize_city(city)] = city
+    return list(cities.values())
+
+
+def fetch_cities(cities, concurrency=MULTI_CITY_CONCURRENCY):
+    """
+    Fetches current weather for many cities, at most concurrency at a time and
+    within the shared API rate limit. concurrency is capped at HTTP_POOL_SIZE,
+    since urllib3 discards connections beyond its pool size. Duplicate cities
+    are fetched once and cached responses are reused.
+    Returns (results, stats): results maps each unique city to its response
+    (None on failure); stats reports throughput, quota usage and, under
+    errors, why each failed city failed.
+    """
+    unique = {}
+    for city in cities:
+        unique.setdefault(normalize_city(city), city)
+
+    def fetch(city):
+        timing = {}
+        return get_weather(city, timing), timing
+
+    started = time.perf_counter()
+    workers = min(max(1, concurrency), HTTP_POOL_SIZE)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="weather-multi") as pool:
+        fetched = list(pool.map(fetch, unique.values()))
+    elapsed = time.perf_counter() - started
+
+    results = {city: value for city, (value, _) in zip(unique.values(), fetched)}
+    errors = {city: timing["error"] for city, (value, timing) in zip(unique.values(), fetched) if value is None}
+    api_calls = sum(1 for _, timing in fetched if not timing["cached"])
+    stats = {
+        "requested": len(cities),
+        "unique": len(unique),
+        "failed": len(errors),
+        "errors": errors,
+        "seconds": elapsed,
+        "cities_per_second": len(unique) / elapsed if elapsed else 0.0,
+        "api_calls": api_calls,
+        "cache_hits": len(unique) - api_calls,
+        "quota_per_minute": CALLS_PER_MINUTE,
+        "quota_available": rate_limiter.stats()["available"],
+    }
+    return results, stats
+
+
+def refresh_stats():
+    """Background refresh counters: refreshes, failures and lag behind schedule"""
+    return refresher.stats()
+
+
+def cache_stats():
+    """Hit/miss counters of the shared response cache"""
+    return cache.stats()
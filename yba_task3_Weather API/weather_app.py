@@ -1,11 +1,10 @@
 import streamlit as st
-import requests
-import os
-from dotenv import load_dotenv
-from datetime import datetime
-
-# Load environment variables
-load_dotenv()
+import csv
+from forecast import daily_forecast
+from weather_api import (
+    get_weather_and_forecast, cache_stats, fetch_cities, parse_city_list, MULTI_CITY_CONCURRENCY,
+    HTTP_POOL_SIZE, refresher, refresh_stats,
+)
 
 # Configure Streamlit page
 st.set_page_config(
@@ -14,30 +13,6 @@ st.set_page_config(
     layout="centered"
 )
 
-# Initialize API settings
-API_KEY = os.getenv('OPENWEATHER_API_KEY')
-BASE_URL = "http://api.openweathermap.org/data/2.5/"  # Changed from 3.0 to 2.5
-
-def get_weather(city):
-    """Get current weather for a city"""
-    try:
-        url = f"{BASE_URL}weather?q={city}&appid={API_KEY}&units=metric"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return None
-
-def get_forecast(city):
-    """Get 5-day forecast for a city"""
-    try:
-        url = f"{BASE_URL}forecast?q={city}&appid={API_KEY}&units=metric"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return None
-
 # Add custom CSS
 st.markdown("""
     <style>
@@ -56,49 +31,152 @@ st.markdown("""
 # App title
 st.markdown("<h1 style='text-align: center;'>🌤️ Weather Dashboard</h1>", unsafe_allow_html=True)
 
-# City input
-city = st.text_input("Enter City Name", "London")
+def format_age(seconds):
+    """Human readable age such as '45 s', '12 min' or '3 h'"""
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+def read_uploaded_cities(uploaded_file):
+    """City names from an uploaded .txt (one per line) or .csv (first column) file"""
+    text = uploaded_file.getvalue().decode("utf-8", errors="ignore")
+    if not uploaded_file.name.lower().endswith(".csv"):
+        return text
+    rows = [row[0] for row in csv.reader(text.splitlines()) if row]
+    if rows and rows[0].strip().lower() in ("city", "cities", "name"):
+        rows = rows[1:]
+    return "\n".join(rows)
+
+def show_multi_city_dashboard():
+    """Fetch many cities in parallel and show them in one table"""
+    text = st.text_area("Cities (one per line or comma-separated)", "London\nParis\nTokyo\nNew York")
+    uploaded_file = st.file_uploader("Or upload a list of cities", type=["txt", "csv"])
+    if uploaded_file is not None:
+        text += "\n" + read_uploaded_cities(uploaded_file)
+    cities = parse_city_list(text)
+    # More parallel requests than pooled connections would just churn connections
+    concurrency = st.slider("Parallel requests", 1, HTTP_POOL_SIZE, min(MULTI_CITY_CONCURRENCY, HTTP_POOL_SIZE))
+
+    if cities and st.button(f"Fetch weather for {len(cities)} cities"):
+        results, stats = fetch_cities(cities, concurrency)
+        rows = []
+        for city, data in results.items():
+            if data:
+                rows.append({
+                    "City": f"{data.name}, {data.country}",
+                    "Temperature (°C)": round(data.temp, 1),
+                    "Feels like (°C)": round(data.feels_like, 1),
+                    "Humidity (%)": data.humidity,
+                    "Wind (m/s)": data.wind_speed,
+                    "Weather": data.description.capitalize(),
+                })
+            else:
+                rows.append({"City": city, "Weather": f"Unavailable: {stats['errors'][city] or 'no data'}"})
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.caption(
+            f"{stats['unique']} cities in {stats['seconds']:.2f}s "
+            f"({stats['cities_per_second']:.1f} cities/s): "
+            f"{stats['api_calls']} API calls, {stats['cache_hits']} from cache, {stats['failed']} failed. "
+            f"Quota: {stats['quota_available']:.0f} of {stats['quota_per_minute']:.0f} calls/minute available."
+        )
+
+# Single city or multi-city dashboard
+mode = st.radio("Mode", ["Single city", "Multiple cities"], horizontal=True)
+
+if mode == "Multiple cities":
+    show_multi_city_dashboard()
+    city = None
+else:
+    # City input
+    city = st.text_input("Enter City Name", "London")
 
 if city:
-    # Get current weather
-    weather_data = get_weather(city)
+    # Get current weather and forecast in parallel
+    weather_data, forecast_data, timings = get_weather_and_forecast(city)
     
     if weather_data:
         # Current weather section
         st.markdown("### Current Weather")
+
+        # Staleness badge: cached data is served while a refresh runs in the background
+        weather_timing = timings["calls"][0]
+        if weather_timing["stale"]:
+            st.warning(f"Showing data from {format_age(weather_timing['age'])} ago while it refreshes in the background.")
+        elif weather_timing["age"]:
+            st.caption(f"Updated {format_age(weather_timing['age'])} ago")
+
+        pinned = st.checkbox("📌 Keep this city refreshed in the background", value=refresher.is_pinned(city))
+        if pinned and not refresher.is_pinned(city):
+            refresher.pin(city)
+        elif not pinned and refresher.is_pinned(city):
+            refresher.unpin(city)
         col1, col2 = st.columns(2)
         
         with col1:
-            st.markdown(f"<p class='big-font'>{weather_data['name']}, {weather_data['sys']['country']}</p>", unsafe_allow_html=True)
-            st.markdown(f"Temperature: **{round(weather_data['main']['temp'], 1)}°C**")
-            st.markdown(f"Feels like: **{round(weather_data['main']['feels_like'], 1)}°C**")
+            st.markdown(f"<p class='big-font'>{weather_data.name}, {weather_data.country}</p>", unsafe_allow_html=True)
+            st.markdown(f"Temperature: **{round(weather_data.temp, 1)}°C**")
+            st.markdown(f"Feels like: **{round(weather_data.feels_like, 1)}°C**")
         
         with col2:
-            st.markdown(f"Humidity: **{weather_data['main']['humidity']}%**")
-            st.markdown(f"Wind Speed: **{weather_data['wind']['speed']} m/s**")
-            st.markdown(f"Weather: **{weather_data['weather'][0]['description'].capitalize()}**")
+            st.markdown(f"Humidity: **{weather_data.humidity}%**")
+            st.markdown(f"Wind Speed: **{weather_data.wind_speed} m/s**")
+            st.markdown(f"Weather: **{weather_data.description.capitalize()}**")
         
-        # Get and display forecast
-        forecast_data = get_forecast(city)
+        # Display forecast
         if forecast_data:
             st.markdown("### 5-Day Forecast")
+            # Daily aggregates by the city's local calendar day
+            days = daily_forecast(forecast_data)[:5]
             cols = st.columns(5)
             
-            for idx, item in enumerate(forecast_data['list'][::8]):  # Get one forecast per day
-                date = datetime.fromtimestamp(item['dt']).strftime('%Y-%m-%d')
-                temp = round(item['main']['temp'], 1)
-                desc = item['weather'][0]['description'].capitalize()
+            for idx, day in enumerate(days):
+                date = day.date.strftime('%a %Y-%m-%d')
+                desc = day.condition.capitalize()
+                precipitation = f"<p>💧 {day.precipitation_mm:.1f} mm</p>" if day.precipitation_mm > 0 else ""
                 
                 with cols[idx]:
                     st.markdown(f"""
                     <div class='forecast-box'>
                         <p><strong>{date}</strong></p>
-                        <p>{temp}°C</p>
+                        <p>{day.temp_max:.1f}° / {day.temp_min:.1f}°C</p>
+                        <p>Avg {day.temp_mean:.1f}°C</p>
                         <p>{desc}</p>
+                        {precipitation}
                     </div>
                     """, unsafe_allow_html=True)
     else:
-        st.error("Error fetching weather data. Please check the city name and try again.")
+        reason = timings["calls"][0]["error"]
+        st.error(f"Error fetching weather data ({reason or 'no data'}). Please check the city name and try again.")
+
+    # Latency breakdown per API call
+    with st.expander("Request timings"):
+        for call in timings["calls"]:
+            source = "cache" if call["cached"] else f"HTTP {call['status']}, {call['attempts']} attempt(s)"
+            st.write(f"`{call['endpoint']}`: {call['seconds'] * 1000:.0f} ms ({source})")
+        st.write(f"Total: {timings['total_seconds'] * 1000:.0f} ms")
+
+# Cache statistics
+with st.expander("Cache statistics"):
+    stats = cache_stats()
+    st.write(
+        f"Hit rate: **{stats['hit_rate']:.0%}** "
+        f"({stats['hits']} memory hits, {stats['disk_hits']} disk hits, {stats['misses']} misses), "
+        f"{stats['entries']} of {stats['max_entries']} entries used"
+    )
+
+# Background refresh statistics
+with st.expander("Background refresh"):
+    stats = refresh_stats()
+    st.write(
+        f"Tracking **{stats['tracked']}** entries ({stats['pinned']} pinned cities). "
+        f"{stats['refreshes']} refreshes, {stats['failures']} failures "
+        f"({stats['consecutive_failures']} in a row). "
+        f"Lag behind schedule: {stats['average_lag_seconds']:.0f} s average, {stats['max_lag_seconds']:.0f} s max."
+    )
+    if stats["last_failure"]:
+        st.write(f"Last failure: {stats['last_failure']}")
 
 # Add footer
 st.markdown("---")